@@ -1,9 +1,18 @@
+import io
+import os
 import streamlit as st
 import pandas as pd
-from components.data_loader import list_available_datasets, load_selected_datasets
+
+# Copy-on-write para todo el proceso, antes de que app.py o las páginas usen el corpus compartido
+# (ver components/corpus.py). Las páginas solo trabajan con datos cargados aquí, así que app.py
+# siempre se ejecuta antes que ellas.
+pd.set_option('mode.copy_on_write', True)
+
+from components.corpus import huella_fuente, huella_fuentes, obtener_corpus_compartido, obtener_fuente_cacheada, estado_almacen_corpus
+from components.data_loader import list_available_datasets
 from components.data_type import corregir_tipos_de_datos
 from components.data_processing import calcular_frecuencia_colaboradores, preparar_csv_para_descarga
-from components.data_processing_bio import cargar_datos_biograficos, crear_dataset_unico, identificar_colaboradores
+from components.data_processing_bio import cargar_datos_biograficos, crear_dataset_unico, identificar_colaboradores, RUTAS_DATOS_BIOGRAFICOS
 
 # --- DEFINICIONES PARA CONSISTENCIA DE ESQUEMAS ---
 CORE_COLUMNS = [
@@ -37,6 +46,74 @@ RENAMING_MAP = {
 }
 # --- FIN DE DEFINICIONES DE ESQUEMAS ---
 
+
+def alinear_esquema(df_original, keep_unmapped_columns=True):
+    """
+    Alinea un dataset al esquema común: cada columna de CORE_COLUMNS se toma de la primera columna
+    original que RENAMING_MAP asigna a ella (o de la columna con el mismo nombre); las que no existen
+    quedan vacías. Con 'keep_unmapped_columns' se conservan también las demás columnas, renombradas
+    según RENAMING_MAP cuando corresponde.
+    """
+    df_aligned = pd.DataFrame()
+    original_cols_data = {col_name: df_original[col_name] for col_name in df_original.columns}
+    used_original_cols_for_core = set()
+
+    for core_col in CORE_COLUMNS:
+        mapped_found = False
+        for original_col_name_map, target_core_name_map in RENAMING_MAP.items():
+            if target_core_name_map == core_col and original_col_name_map in original_cols_data:
+                if original_col_name_map not in used_original_cols_for_core:
+                    df_aligned[core_col] = original_cols_data[original_col_name_map]
+                    used_original_cols_for_core.add(original_col_name_map)
+                    mapped_found = True
+                    break
+        if not mapped_found and core_col in original_cols_data:
+            if core_col not in used_original_cols_for_core:
+                df_aligned[core_col] = original_cols_data[core_col]
+                used_original_cols_for_core.add(core_col)
+                mapped_found = True
+        if not mapped_found:
+            df_aligned[core_col] = pd.NA
+
+    if keep_unmapped_columns:
+        for original_col_name_extra, data_series_extra in original_cols_data.items():
+            if original_col_name_extra not in used_original_cols_for_core:
+                final_extra_col_name = RENAMING_MAP.get(original_col_name_extra, original_col_name_extra)
+                if final_extra_col_name not in df_aligned.columns:
+                    df_aligned[final_extra_col_name] = data_series_extra
+                elif final_extra_col_name == original_col_name_extra and original_col_name_extra not in df_aligned.columns:
+                    df_aligned[original_col_name_extra] = data_series_extra
+    return df_aligned
+
+
+def construir_corpus_alineado(fuentes, keep_unmapped_columns=True):
+    """
+    Lee las fuentes (nombre, ruta, contenido, huella), alinea cada una con alinear_esquema, concatena las
+    que se pudieron leer y corrige los tipos. Cada fuente alineada se toma de la caché de fuentes si ya se
+    leyó antes con el mismo contenido. No escribe nada en la interfaz (puede ejecutarse para otra sesión
+    dentro del almacén compartido): devuelve (corpus o None, {'origen': {nombre: 'leída' | 'caché'},
+    'errores': {nombre: mensaje}}) y quien la llama muestra el estado.
+    """
+    aligned_dfs_list = []
+    estado = {'origen': {}, 'errores': {}}
+    for source_name, ruta, contenido, huella in fuentes:
+        def leer_y_alinear():
+            try:
+                df_original = pd.read_csv(io.BytesIO(contenido)) if contenido is not None else pd.read_csv(ruta)
+            except Exception as e:
+                estado['errores'][source_name] = str(e)
+                return None
+            return alinear_esquema(df_original, keep_unmapped_columns)
+
+        df_aligned, desde_cache = obtener_fuente_cacheada(huella_fuentes([huella], keep_unmapped_columns), leer_y_alinear)
+        if df_aligned is None:
+            continue
+        estado['origen'][source_name] = 'caché' if desde_cache else 'leída'
+        aligned_dfs_list.append(df_aligned)
+    if not aligned_dfs_list:
+        return None, estado
+    return corregir_tipos_de_datos(pd.concat(aligned_dfs_list, ignore_index=True, join='outer')), estado
+
 st.set_page_config(page_title="Hemerograph - Configuración", layout="wide")
 st.title("📚 Dashboard de revistas culturales y literarias")
 st.header("🏠 Configuración de datos para el análisis")
@@ -46,12 +123,19 @@ default_session_states = {
     'combined_data_df_initial': None,
     'selected_columns_for_analysis': [],
     'data_sources_names': [],
+    'origen_fuentes': {}, # Por fuente: 'leída', 'caché' o 'corpus compartido'
+    'errores_fuentes': {}, # Fuentes que no se pudieron leer en la última carga: nombre -> mensaje
+    'huellas_subidas': {}, # file_id -> huella del contenido de cada archivo subido
     'initial_load_and_align_complete': False,
     'integrate_bio_checkbox_state': False, # Para controlar el checkbox explícitamente
     'bio_data_processing_done': False, # Para saber si el bloque de bio se ejecutó
     'bio_data_successfully_integrated': False,
     'datos_biograficos_raw_df': None,
     'df_listo_para_seleccion_cols': None,
+    # Asas de los corpus compartidos por el proceso (ver components/corpus.py)
+    'asa_corpus': None,
+    'asa_corpus_bio': None,
+    'asa_datos_biograficos': None,
 }
 
 for key, default_value in default_session_states.items():
@@ -63,6 +147,11 @@ for key, default_value in default_session_states.items():
 with st.sidebar:
     st.header("Paso 1: Carga inicial de datasets")
     uploaded_files_list = st.file_uploader("Sube tus archivos CSV:", type="csv", accept_multiple_files=True, key="file_uploader_main")
+    # Cada archivo subido se identifica por el hash de su contenido una sola vez, al recibirlo
+    st.session_state.huellas_subidas = {
+        archivo.file_id: st.session_state.huellas_subidas.get(archivo.file_id) or huella_fuente(contenido=archivo.getvalue())
+        for archivo in (uploaded_files_list or [])
+    }
     DATA_PATH_EXAMPLES = "data/models/"
     try:
         example_files_available = list_available_datasets(path=DATA_PATH_EXAMPLES)
@@ -72,71 +161,42 @@ with st.sidebar:
     keep_unmapped_columns = st.checkbox("¿Conservar columnas no mapeadas/no esenciales?", value=True, key="keep_unmapped_main_cb") # Renombrada clave
 
     if st.button("1. Cargar y alinear datasets seleccionados", key="load_align_button_main"):
-        all_dataframes_to_process = []
-        current_data_sources_names_list = []
-
-        if uploaded_files_list:
-            for uploaded_file_obj in uploaded_files_list:
-                try:
-                    df = pd.read_csv(uploaded_file_obj)
-                    all_dataframes_to_process.append(df)
-                    current_data_sources_names_list.append(f"Subido: {uploaded_file_obj.name}")
-                except Exception as e:
-                    st.error(f"Error al leer '{uploaded_file_obj.name}': {e}")
-        
-        if selected_example_names:
-            try:
-                loaded_examples_dict = load_selected_datasets(selected_example_names, path=DATA_PATH_EXAMPLES)
-                for name, df_example in loaded_examples_dict.items():
-                    all_dataframes_to_process.append(df_example)
-                    current_data_sources_names_list.append(f"Ejemplo: {name}.csv")
-            except Exception as e:
-                st.error(f"Error al cargar datasets de ejemplo: {e}")
-
-        if all_dataframes_to_process:
-            aligned_dfs_list = []
-            st.write("--- Alineando esquemas... ---") # Feedback en la sidebar
-            for i, df_original in enumerate(all_dataframes_to_process):
-                source_name = current_data_sources_names_list[i]
-                st.caption(f"Procesando: {source_name}")
-                df_aligned = pd.DataFrame()
-                original_cols_data = {col_name: df_original[col_name] for col_name in df_original.columns}
-                used_original_cols_for_core = set()
-
-                for core_col in CORE_COLUMNS:
-                    mapped_found = False
-                    for original_col_name_map, target_core_name_map in RENAMING_MAP.items():
-                        if target_core_name_map == core_col and original_col_name_map in original_cols_data:
-                            if original_col_name_map not in used_original_cols_for_core:
-                                df_aligned[core_col] = original_cols_data[original_col_name_map]
-                                used_original_cols_for_core.add(original_col_name_map)
-                                mapped_found = True
-                                break
-                    if not mapped_found and core_col in original_cols_data:
-                        if core_col not in used_original_cols_for_core:
-                            df_aligned[core_col] = original_cols_data[core_col]
-                            used_original_cols_for_core.add(core_col)
-                            mapped_found = True
-                    if not mapped_found:
-                        df_aligned[core_col] = pd.NA
-                
-                if keep_unmapped_columns:
-                    for original_col_name_extra, data_series_extra in original_cols_data.items():
-                        if original_col_name_extra not in used_original_cols_for_core:
-                            final_extra_col_name = RENAMING_MAP.get(original_col_name_extra, original_col_name_extra)
-                            if final_extra_col_name not in df_aligned.columns:
-                                df_aligned[final_extra_col_name] = data_series_extra
-                            elif final_extra_col_name == original_col_name_extra and original_col_name_extra not in df_aligned.columns:
-                                df_aligned[original_col_name_extra] = data_series_extra
-                aligned_dfs_list.append(df_aligned)
-            
-            if aligned_dfs_list:
-                st.session_state.combined_data_df_initial = pd.concat(aligned_dfs_list, ignore_index=True, join='outer')
-                st.session_state.combined_data_df_initial = corregir_tipos_de_datos(st.session_state.combined_data_df_initial)
-
-                st.session_state.data_sources_names = current_data_sources_names_list
+        # Fuentes como (nombre, ruta, contenido, huella): los archivos subidos se identifican por su contenido
+        fuentes_seleccionadas = [
+            (f"Subido: {archivo.name}", None, archivo.getvalue(), st.session_state.huellas_subidas[archivo.file_id])
+            for archivo in (uploaded_files_list or [])
+        ]
+        for name in selected_example_names:
+            ruta_ejemplo = os.path.join(DATA_PATH_EXAMPLES, f"{name}.csv")
+            fuentes_seleccionadas.append((f"Ejemplo: {name}.csv", ruta_ejemplo, None, huella_fuente(ruta=ruta_ejemplo)))
+
+        if fuentes_seleccionadas:
+            # El corpus se construye una sola vez por proceso y selección; las sesiones lo comparten.
+            # Si ya estaba construido, todas sus fuentes se sirven desde el corpus compartido. Un corpus
+            # al que le falta alguna fuente no se publica: solo lo usa esta sesión.
+            construccion = {}
+            def construir_completo():
+                construccion['corpus'], construccion['estado'] = construir_corpus_alineado(fuentes_seleccionadas, keep_unmapped_columns)
+                return None if construccion['estado']['errores'] else construccion['corpus']
+
+            huella_seleccion = huella_fuentes([huella for *_, huella in fuentes_seleccionadas], keep_unmapped_columns)
+            corpus_combinado, asa_corpus = obtener_corpus_compartido(huella_seleccion, construir_completo)
+            if corpus_combinado is None:
+                corpus_combinado = construccion.get('corpus')
+            estado_carga = construccion.get('estado', {'origen': {}, 'errores': {}})
+            st.session_state.errores_fuentes = estado_carga['errores'] # Se muestran más abajo, también tras st.rerun
+
+            if corpus_combinado is not None and not corpus_combinado.empty:
+                st.session_state.combined_data_df_initial = corpus_combinado
+                st.session_state.asa_corpus = asa_corpus
+                st.session_state.asa_corpus_bio = None
+
+                st.session_state.data_sources_names = [nombre for nombre, *_ in fuentes_seleccionadas if nombre not in estado_carga['errores']]
+                st.session_state.origen_fuentes = {
+                    nombre: estado_carga['origen'].get(nombre, 'corpus compartido') for nombre in st.session_state.data_sources_names
+                }
                 st.session_state.initial_load_and_align_complete = True
-                st.session_state.df_listo_para_seleccion_cols = st.session_state.combined_data_df_initial.copy()
+                st.session_state.df_listo_para_seleccion_cols = st.session_state.combined_data_df_initial
                 st.session_state.selected_columns_for_analysis = st.session_state.df_listo_para_seleccion_cols.columns.tolist()
                 # Resetear flags de bio
                 st.session_state.integrate_bio_checkbox_state = False 
@@ -149,6 +209,20 @@ with st.sidebar:
         else:
             st.warning("No se seleccionaron o cargaron datasets válidos.")
 
+    for nombre, mensaje in st.session_state.errores_fuentes.items():
+        st.error(f"No se pudo leer '{nombre}' y no se ha incluido en el corpus: {mensaje}")
+    if st.session_state.origen_fuentes:
+        st.markdown("**Origen de las fuentes cargadas:**")
+        iconos_origen = {'leída': "📄", 'caché': "♻️", 'corpus compartido': "♻️"}
+        for nombre, origen in st.session_state.origen_fuentes.items():
+            st.caption(f"{iconos_origen.get(origen, '')} {nombre}: {origen}")
+
+    estado_corpus = estado_almacen_corpus()
+    if estado_corpus['corpus']:
+        st.caption(f"Corpus compartidos en el servidor: {estado_corpus['corpus']} ({estado_corpus['bytes'] / 1024 ** 2:,.1f} MB, {estado_corpus['en_uso']} en uso).")
+    if estado_corpus['fuentes']:
+        st.caption(f"Fuentes en caché: {estado_corpus['fuentes']} ({estado_corpus['bytes_fuentes'] / 1024 ** 2:,.1f} MB).")
+
 # --- CUERPO PRINCIPAL DE LA APLICACIÓN ---
 if not st.session_state.get('initial_load_and_align_complete', False):
     st.info("👋 ¡Bienvenido! Comienza por cargar tus datasets en la barra lateral (Paso 1).")
@@ -173,7 +247,7 @@ else: # Paso 1 completado, mostrar Paso 2 y 3
     # y si el estado base (df_initial) no ha cambiado de forma que requiera re-evaluación.
     if st.session_state.integrate_bio_checkbox_state:
         st.markdown("Intentando integrar datos biográficos...") # Feedback
-        df_initial_for_bio = st.session_state.combined_data_df_initial.copy()
+        df_initial_for_bio = st.session_state.combined_data_df_initial
 
         if 'Colaborador' not in df_initial_for_bio.columns:
             st.error("La columna 'Colaborador' es necesaria para la fusión biográfica, pero no se encontró.")
@@ -182,12 +256,19 @@ else: # Paso 1 completado, mostrar Paso 2 y 3
         else:
             with st.spinner("Cargando y fusionando datos biográficos..."):
                 try:
-                    bio_df_raw = cargar_datos_biograficos()
+                    # Tabla biográfica y fusión compartidas por el proceso (una sola copia para todas las sesiones)
+                    huella_bio = huella_fuentes([huella_fuente(ruta=ruta) for ruta in RUTAS_DATOS_BIOGRAFICOS if os.path.exists(ruta)], 'biograficos')
+                    bio_df_raw, st.session_state.asa_datos_biograficos = obtener_corpus_compartido(huella_bio, cargar_datos_biograficos)
                     st.session_state.datos_biograficos_raw_df = bio_df_raw
-                    
-                    df_merged_con_bio = crear_dataset_unico(df_initial_for_bio, bio_df_raw)
+
+                    fusionar_con_bio = lambda: corregir_tipos_de_datos(crear_dataset_unico(df_initial_for_bio, bio_df_raw))
+                    if st.session_state.asa_corpus is not None:
+                        huella_fusion = huella_fuentes([], st.session_state.asa_corpus.huella, huella_bio)
+                        df_merged_con_bio, st.session_state.asa_corpus_bio = obtener_corpus_compartido(huella_fusion, fusionar_con_bio)
+                    else:
+                        df_merged_con_bio = fusionar_con_bio()
                     # st.session_state.df_listo_para_seleccion_cols = df_merged_con_bio.copy()
-                    st.session_state.df_listo_para_seleccion_cols = corregir_tipos_de_datos(df_merged_con_bio).copy()
+                    st.session_state.df_listo_para_seleccion_cols = df_merged_con_bio
                     st.session_state.bio_data_successfully_integrated = True
                     st.success("Datos biográficos fusionados con éxito.")
                     # st.dataframe(df_merged_con_bio)
@@ -211,13 +292,14 @@ else: # Paso 1 completado, mostrar Paso 2 y 3
                 except Exception as e:
                     st.error(f"Error durante la integración biográfica: {e}")                
                     st.session_state.bio_data_successfully_integrated = False
-                    st.session_state.df_listo_para_seleccion_cols = st.session_state.combined_data_df_initial.copy()
+                    st.session_state.df_listo_para_seleccion_cols = st.session_state.combined_data_df_initial
                     raise
         st.session_state.bio_data_processing_done = True # Marcar que este bloque se ejecutó
 
     else: # Checkbox de bio no está marcado
         # Si se desmarcó o nunca se marcó, usar el DF inicial
-        st.session_state.df_listo_para_seleccion_cols = st.session_state.combined_data_df_initial.copy()
+        st.session_state.df_listo_para_seleccion_cols = st.session_state.combined_data_df_initial
+        st.session_state.asa_corpus_bio = None
         if st.session_state.bio_data_processing_done and st.session_state.bio_data_successfully_integrated:
              st.info("Integración de datos biográficos desactivada. Trabajando con el dataset inicial.")
         st.session_state.bio_data_successfully_integrated = False
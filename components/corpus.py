@@ -0,0 +1,153 @@
+# components/corpus.py
+# Corpus compartido por app.py y las páginas. app.py activa el modo copy-on-write de pandas al
+# arrancar (antes de que ninguna página use el corpus): las proyecciones de columnas comparten la
+# memoria del corpus y solo se copia una columna cuando alguien la modifica, así que una sesión
+# mantiene en memoria aproximadamente un único corpus aunque tenga abiertas todas las páginas. Las
+# funciones que modifican DataFrames recibidos del almacén siguen haciendo su propia copia.
+#
+# Además, los corpus ya cargados, alineados y corregidos se guardan una sola vez por proceso,
+# identificados por la huella de sus fuentes: las sesiones que eligen los mismos datasets
+# comparten el mismo DataFrame y solo guardan un 'asa' que cuenta las referencias. Los corpus
+# sin referencias se descartan por antigüedad (LRU) cuando se supera el límite de memoria.
+# Cada fuente se guarda también por separado, ya leída y alineada, en una caché acotada: volver a
+# subir el mismo archivo o combinarlo con otros no obliga a leerlo de nuevo.
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+import pandas as pd
+
+# Memoria máxima (MB) de los corpus sin sesiones que los usen; configurable por variable de entorno
+LIMITE_MEMORIA_CORPUS = int(os.environ.get('HEMEROGRAPH_LIMITE_CORPUS_MB', 1024)) * 1024 ** 2
+# Memoria máxima (MB) de la caché de fuentes leídas y alineadas
+LIMITE_MEMORIA_FUENTES = int(os.environ.get('HEMEROGRAPH_LIMITE_FUENTES_MB', 256)) * 1024 ** 2
+
+_CORPUS = OrderedDict()  # huella -> {'datos': DataFrame, 'bytes': int, 'referencias': int}
+_CONSTRUCCIONES = {}  # huella -> Lock, para que solo una sesión construya cada corpus
+_FUENTES = OrderedDict()  # huella de fuente -> {'datos': DataFrame, 'bytes': int}
+_CERROJO = threading.Lock()
+
+
+def proyectar_corpus(df, columnas):
+    """
+    Devuelve las 'columnas' del corpus sin copiar sus datos. Con copy-on-write el resultado se comporta
+    como una copia independiente: añadir o modificar columnas en él nunca altera el corpus de la sesión.
+    """
+    return df[list(columnas)]
+
+
+def huella_fuente(ruta=None, contenido=None):
+    """
+    Huella de una fuente: los archivos subidos se identifican por el SHA-1 de su 'contenido'; los
+    archivos en disco, por 'ruta', tamaño y fecha de modificación.
+    """
+    if contenido is not None:
+        return 'contenido:' + hashlib.sha1(contenido).hexdigest()
+    estado = os.stat(ruta)
+    return f"ruta:{os.path.abspath(ruta)}:{estado.st_size}:{estado.st_mtime_ns}"
+
+
+def huella_fuentes(huellas, *opciones):
+    """
+    Huella de una selección de fuentes a partir de sus huellas individuales (ver huella_fuente). Las
+    'opciones' que cambian el resultado (p. ej. conservar columnas no mapeadas) forman parte de ella.
+    """
+    h = hashlib.sha1()
+    for huella in huellas:
+        h.update(huella.encode('utf-8') + b'\0')
+    h.update(repr(opciones).encode('utf-8'))
+    return h.hexdigest()
+
+
+def obtener_fuente_cacheada(huella, construir):
+    """
+    Devuelve (datos, desde_cache) para una fuente: los datos ya leídos y alineados si están en la caché
+    de fuentes, o el resultado de 'construir()' (que se guarda si no es None). La caché descarta las
+    fuentes menos usadas recientemente cuando supera LIMITE_MEMORIA_FUENTES.
+    """
+    with _CERROJO:
+        if huella in _FUENTES:
+            _FUENTES.move_to_end(huella)
+            return _FUENTES[huella]['datos'], True
+    datos = construir()
+    if datos is not None:
+        with _CERROJO:
+            _FUENTES[huella] = {'datos': datos, 'bytes': int(datos.memory_usage(deep=True).sum())}
+            total = sum(entrada['bytes'] for entrada in _FUENTES.values())
+            while total > LIMITE_MEMORIA_FUENTES and len(_FUENTES) > 1:
+                total -= _FUENTES.popitem(last=False)[1]['bytes']
+    return datos, False
+
+
+def _recortar_almacen():
+    """Descarta los corpus sin referencias más antiguos mientras se supere el límite de memoria."""
+    total = sum(entrada['bytes'] for entrada in _CORPUS.values())
+    for huella in list(_CORPUS):
+        if total <= LIMITE_MEMORIA_CORPUS:
+            break
+        if _CORPUS[huella]['referencias'] == 0:
+            total -= _CORPUS.pop(huella)['bytes']
+
+
+class _AsaCorpus:
+    """Referencia de una sesión a un corpus del almacén; al desaparecer (o morir la sesión) descuenta su uso."""
+
+    def __init__(self, huella):
+        self.huella = huella
+        weakref.finalize(self, _liberar_referencia, huella)
+
+
+def _liberar_referencia(huella):
+    with _CERROJO:
+        if huella in _CORPUS:
+            _CORPUS[huella]['referencias'] = max(0, _CORPUS[huella]['referencias'] - 1)
+            _recortar_almacen()
+
+
+def _adquirir_existente(huella):
+    """Con el cerrojo tomado: marca el corpus como recién usado y suma una referencia."""
+    _CORPUS.move_to_end(huella)
+    _CORPUS[huella]['referencias'] += 1
+    return _CORPUS[huella]['datos'], _AsaCorpus(huella)
+
+
+def obtener_corpus_compartido(huella, construir):
+    """
+    Devuelve (corpus, asa) para 'huella', construyendo el corpus con 'construir()' solo si no está en el
+    almacén del proceso. 'construir' debe devolver None si no puede construir el corpus completo: en ese
+    caso no se guarda nada y se devuelve (None, None), para no servir a otras sesiones datos incompletos.
+    Si varias sesiones lo piden a la vez, una lo construye y las demás esperan y lo reutilizan. La sesión guarda el asa en st.session_state: mientras exista, el corpus no se descarta;
+    se libera al sustituirla o al terminar la sesión. El DataFrame es compartido entre sesiones: no debe
+    modificarse en el sitio (usar proyectar_corpus).
+    """
+    with _CERROJO:
+        if huella in _CORPUS:
+            return _adquirir_existente(huella)
+        cerrojo_construccion = _CONSTRUCCIONES.setdefault(huella, threading.Lock())
+    with cerrojo_construccion:
+        with _CERROJO:
+            if huella in _CORPUS:
+                return _adquirir_existente(huella)
+        datos = construir()
+        with _CERROJO:
+            if datos is None:
+                _CONSTRUCCIONES.pop(huella, None)
+                return None, None
+            _CORPUS[huella] = {'datos': datos, 'bytes': int(datos.memory_usage(deep=True).sum()), 'referencias': 0}
+            _CONSTRUCCIONES.pop(huella, None)
+            resultado = _adquirir_existente(huella)
+            _recortar_almacen()
+    return resultado
+
+
+def estado_almacen_corpus():
+    """Resumen del almacén: número de corpus, memoria total (bytes), corpus en uso y fuentes en caché."""
+    with _CERROJO:
+        return {
+            'corpus': len(_CORPUS),
+            'bytes': sum(entrada['bytes'] for entrada in _CORPUS.values()),
+            'en_uso': sum(1 for entrada in _CORPUS.values() if entrada['referencias'] > 0),
+            'fuentes': len(_FUENTES),
+            'bytes_fuentes': sum(entrada['bytes'] for entrada in _FUENTES.values()),
+        }
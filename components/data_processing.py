@@ -1,4 +1,8 @@
+import hashlib
+import numpy as np
 import pandas as pd
+import streamlit as st
+from scipy import sparse
 
 def calcular_frecuencia_colaboradores(df):
     """
@@ -282,6 +286,121 @@ def analizar_traducciones(df, col_traduccion='Traducción', col_traductor='Tradu
     return frec_traductores, frec_tipologias, frec_autores_traducidos
 
 
+def _huella_datos(df):
+    """Huella (hash hexadecimal) del contenido de un DataFrame, independiente del orden de las filas."""
+    h = hashlib.sha1(','.join(map(str, df.columns)).encode('utf-8'))
+    h.update(np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+def _bloque_normalizado(codigos_fila, codigos_columna, num_filas, num_columnas):
+    """Matriz dispersa de conteos fila × categoría con cada fila normalizada a norma L2 unitaria."""
+    bloque = sparse.csr_matrix(
+        (np.ones(len(codigos_fila)), (codigos_fila, codigos_columna)), shape=(num_filas, num_columnas)
+    )
+    normas = np.sqrt(np.asarray(bloque.multiply(bloque).sum(axis=1)).ravel())
+    return sparse.diags(np.divide(1.0, normas, out=np.zeros(num_filas), where=normas > 0)) @ bloque
+
+
+def construir_indice_similitud_colaboradores(df, col_autor='Colaborador', col_revista='Revista', col_tipologia='Tipología', col_fecha='Fecha Publicación'):
+    """
+    Construye el índice de perfiles de colaboradores: un vector disperso por colaborador que concatena
+    su incidencia en revistas, su distribución de tipologías y sus años de actividad (los nombres nulos
+    o vacíos se descartan). Cada bloque se normaliza por separado (para que pesen lo mismo) y el vector
+    completo tiene norma 1, de modo que el producto escalar entre dos filas es su similitud del coseno.
+
+    Args:
+        df (pd.DataFrame): El DataFrame de entrada.
+        col_autor, col_revista, col_tipologia, col_fecha (str): Columnas usadas; las ausentes se omiten.
+
+    Returns:
+        dict: {'colaboradores': pd.Index, 'vectores': matriz CSR normalizada, 'bloques': lista de bloques usados}.
+    """
+    columnas = [c for c in [col_revista, col_tipologia, col_fecha] if c in df.columns]
+    if col_autor not in df.columns or not columnas:
+        return {'colaboradores': pd.Index([]), 'vectores': sparse.csr_matrix((0, 0)), 'bloques': []}
+
+    df_valid = df[[col_autor] + columnas].dropna(subset=[col_autor])
+    df_valid = df_valid[df_valid[col_autor].astype(str).str.strip() != '']
+    if col_fecha in columnas:
+        df_valid = df_valid.assign(**{col_fecha: pd.to_datetime(df_valid[col_fecha], errors='coerce').dt.year})
+    codigos_autor, colaboradores = pd.factorize(df_valid[col_autor], sort=True)
+
+    bloques, nombres_bloques = [], []
+    for columna in columnas:
+        valores = df_valid[columna]
+        presentes = valores.notna().to_numpy()
+        codigos, categorias = pd.factorize(valores[presentes])
+        if len(categorias) == 0:
+            continue
+        bloques.append(_bloque_normalizado(codigos_autor[presentes], codigos, len(colaboradores), len(categorias)))
+        nombres_bloques.append(columna)
+
+    vectores = sparse.hstack(bloques, format='csr') if bloques else sparse.csr_matrix((len(colaboradores), 0))
+    normas = np.sqrt(np.asarray(vectores.multiply(vectores).sum(axis=1)).ravel())
+    vectores = (sparse.diags(np.divide(1.0, normas, out=np.zeros(len(normas)), where=normas > 0)) @ vectores).tocsr()
+    return {'colaboradores': pd.Index(colaboradores), 'vectores': vectores, 'bloques': nombres_bloques}
+
+
+@st.cache_resource(max_entries=8)
+def _indice_similitud_en_cache(_df, huella, col_autor, col_revista, col_tipologia, col_fecha):
+    """
+    Índice compartido por todas las sesiones, indexado por la huella de los datos (el DataFrame no se
+    hashea). Se guarda con st.cache_resource porque es de solo lectura y no conviene copiarlo en cada consulta.
+    """
+    return dict(construir_indice_similitud_colaboradores(_df, col_autor, col_revista, col_tipologia, col_fecha), huella=huella)
+
+
+def obtener_indice_similitud_colaboradores(df, col_autor='Colaborador', col_revista='Revista', col_tipologia='Tipología', col_fecha='Fecha Publicación'):
+    """
+    Devuelve el índice de similitud de colaboradores para 'df', construyéndolo solo la primera vez
+    que aparece la huella de las columnas usadas (los índices más recientes se conservan en caché).
+    """
+    columnas = [c for c in [col_autor, col_revista, col_tipologia, col_fecha] if c in df.columns]
+    huella = _huella_datos(df[columnas])
+    return _indice_similitud_en_cache(df, huella, col_autor, col_revista, col_tipologia, col_fecha)
+
+
+def buscar_colaboradores_similares(indice, colaboradores, k=10, tamano_lote=256):
+    """
+    Consulta los 'k' colaboradores más similares (coseno) a cada uno de 'colaboradores'. Las consultas
+    se resuelven por lotes con un producto disperso contra todo el índice y una selección con argpartition.
+
+    Args:
+        indice (dict): Resultado de obtener_indice_similitud_colaboradores.
+        colaboradores (list): Nombres a consultar; los que no están en el índice se ignoran.
+        k (int): Número de resultados por colaborador.
+        tamano_lote (int): Consultas por producto disperso.
+
+    Returns:
+        pd.DataFrame: Columnas ['Colaborador', 'Similar', 'Similitud', 'Posicion'].
+    """
+    columnas_salida = ['Colaborador', 'Similar', 'Similitud', 'Posicion']
+    nombres = indice['colaboradores']
+    posiciones = nombres.get_indexer(pd.Index(colaboradores).unique())
+    posiciones = posiciones[posiciones >= 0]
+    k = min(k, len(nombres) - 1)
+    if len(posiciones) == 0 or k < 1:
+        return pd.DataFrame(columns=columnas_salida)
+
+    VT = indice['vectores'].T.tocsc()
+    resultados = []
+    for inicio in range(0, len(posiciones), tamano_lote):
+        lote = posiciones[inicio:inicio + tamano_lote]
+        similitudes = (indice['vectores'][lote] @ VT).toarray()
+        similitudes[np.arange(len(lote)), lote] = -np.inf  # Excluir al propio colaborador
+        mejores = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+        puntuaciones = np.take_along_axis(similitudes, mejores, axis=1)
+        orden = np.argsort(-puntuaciones, axis=1, kind='stable')
+        resultados.append(pd.DataFrame({
+            'Colaborador': np.repeat(nombres[lote].to_numpy(), k),
+            'Similar': nombres[np.take_along_axis(mejores, orden, axis=1).ravel()],
+            'Similitud': np.take_along_axis(puntuaciones, orden, axis=1).ravel(),
+            'Posicion': np.tile(np.arange(1, k + 1), len(lote)),
+        }))
+    return pd.concat(resultados, ignore_index=True)
+
+
 def preparar_csv_para_descarga(df):
     """
     Convierte un DataFrame a formato CSV (bytes) para ser usado con st.download_button.
@@ -2,6 +2,7 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 
+RUTAS_DATOS_BIOGRAFICOS = ("data/colaboradores_datos_biograficos.csv", "data/colaboradores_revistas_culturales.csv")
 
 def cargar_datos_biograficos():
     """
@@ -13,8 +14,8 @@ def cargar_datos_biograficos():
     """
     try:
         # --- 1. Carga de los archivos CSV ---
-        datos_biograficos_bd = pd.read_csv("data/colaboradores_datos_biograficos.csv", encoding="utf-8")
-        datos_biograficos_rc = pd.read_csv("data/colaboradores_revistas_culturales.csv", encoding="utf-8")
+        datos_biograficos_bd = pd.read_csv(RUTAS_DATOS_BIOGRAFICOS[0], encoding="utf-8")
+        datos_biograficos_rc = pd.read_csv(RUTAS_DATOS_BIOGRAFICOS[1], encoding="utf-8")
 
         # --- 2. Preparación y Limpieza (basado en tu lógica) ---
         
@@ -126,6 +127,7 @@ def crear_dataset_unico(combined_dataset, datos_biograficos):
             raise ValueError("Los 'datos_biograficos' deben tener una columna 'Colaborador' para la fusión.")
 
         # Crear copias para trabajar de forma segura sin modificar los DataFrames originales
+        # (pueden ser objetos del almacén compartido por todas las sesiones)
         left_df = combined_dataset.copy()
         right_df = datos_biograficos.copy()
 
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from components.geo import aplicar_clasificacion_dinamica, mapear_por_pais, unir_referencia_geografica
 
 # def estandarizar_paises_con_geocodigo(df, col_pais_origen='PaisOrigen', ruta_mapeo='data/world.csv', col_pais_mapeo='nombre_pais', col_geocodigo_mapeo='geo_code'):
 #     """
@@ -125,7 +126,7 @@ def calcular_metricas_por_pais(df, metrica='colaboradores_unicos', col_pais='Pai
     
 #     return df_enriquecido
 
-def enriquecer_con_geo_info(df_datos, df_world, col_pais_datos='PaisOrigen', col_pais_world='NAME_ES', col_iso_world='ISO_A3_EH', col_region_world='REGION_WB'):
+def enriquecer_con_geo_info(df_datos, df_world, col_pais_datos='PaisOrigen', col_pais_world='NAME_ES', col_iso_world='ISO_A3_EH', col_region_world='REGION_WB', indice_alias=None):
     """
     Toma el dataframe de datos y lo enriquece con el geocode y la región base desde el archivo world.
     """
@@ -133,45 +134,16 @@ def enriquecer_con_geo_info(df_datos, df_world, col_pais_datos='PaisOrigen', col
         print(f"Advertencia: La columna '{col_pais_datos}' no se encuentra en los datos.")
         return df_datos
 
-    df_enriquecido = pd.merge(
-        df_datos,
-        df_world[[col_pais_world, col_iso_world, col_region_world]],
-        left_on=col_pais_datos,
-        right_on=col_pais_world,
-        how='left'
+    # Resolución por valores distintos con el índice de alias (ver components/geo.py)
+    df_enriquecido, df_no_encontrados = unir_referencia_geografica(
+        df_datos, df_world, col_pais_datos, [col_pais_world, col_iso_world, col_region_world], indice_alias
     )
     df_enriquecido.rename(columns={col_iso_world: 'geocode', col_region_world: 'Region_Base'}, inplace=True)
-    
-    # Informar sobre países que no se pudieron mapear
-    paises_no_mapeados = df_enriquecido[df_enriquecido['geocode'].isnull()][col_pais_datos].unique()
-    if len(paises_no_mapeados) > 0:
-        print(f"Advertencia: Países no encontrados en el archivo de mapeo 'world.csv': {list(paises_no_mapeados)}")
-        
+    # Los países que no se pudieron mapear se informan en attrs, como en components/maps.py
+    df_enriquecido.attrs['paises_no_encontrados'] = dict(zip(df_no_encontrados['Pais'], df_no_encontrados['Filas'].astype(int)))
     return df_enriquecido
 
 
-def aplicar_clasificacion_dinamica(df_enriquecido, col_pais_datos='PaisOrigen', pais_central=None, paises_a_aislar=None, grupos_personalizados=None):
-    """
-    Aplica la jerarquía de clasificación regional sobre un DataFrame que ya tiene una 'Region_Base'.
-    """
-    if paises_a_aislar is None: paises_a_aislar = []
-    if grupos_personalizados is None: grupos_personalizados = {}
-
-    pais_a_grupo_personalizado = {pais: nombre_grupo for nombre_grupo, paises in grupos_personalizados.items() for pais in paises}
-
-    def asignar_region_final(row):
-        pais_actual = row[col_pais_datos]
-        if pd.notna(pais_actual):
-            if pais_actual == pais_central: return f"CENTRAL: {pais_actual}"
-            if pais_actual in paises_a_aislar: return pais_actual
-            if pais_actual in pais_a_grupo_personalizado: return pais_a_grupo_personalizado[pais_actual]
-        return row.get('Region_Base', "Sin Región Asignada")
-
-    df_resultado = df_enriquecido.copy()
-    df_resultado['Region'] = df_resultado.apply(asignar_region_final, axis=1)
-    return df_resultado
-
-
 # En data_processing.py
 
 # def clasificacion_regional_dinamica(df, col_pais='PaisOrigen', pais_central=None, paises_a_aislar=None, grupos_personalizados=None):
@@ -355,7 +327,7 @@ def agregar_clasificacion_regional(df, col_pais='PaisOrigen'):
     # Primero aplicamos el mapeo de español a inglés si es necesario (asumiendo que clasificar() espera inglés)
     # Esta es la misma lógica de la función estandarizar_paises_con_geocodigo, que ya aplica esto.
     # Por lo tanto, el DataFrame que reciba esta función ya debería tener nombres en inglés o estandarizados.
-    df_copy['Region'] = df_copy[col_pais].apply(clasificar)
+    df_copy['Region'] = mapear_por_pais(df_copy[col_pais], clasificar, valor_ausente=clasificar(None))
     return df_copy
 
 
@@ -1,21 +1,129 @@
 import streamlit as st # Necesitamos importar streamlit para usar el caché
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import pandas as pd
 import networkx as nx
 from networkx.algorithms import community
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from components import trabajador_comunidades
+
+
+def calcular_huella_grafo(G):
+    """
+    Devuelve una huella estable (hash hexadecimal) de los nodos y aristas de un grafo.
+    Se usa como clave de caché para los cálculos que reciben el grafo como argumento ignorado ('_G').
+    """
+    nodos = pd.Series([str(n) for n in G.nodes()], dtype=object)
+    orientar = (lambda u, v: (u, v)) if G.is_directed() else (lambda u, v: tuple(sorted((u, v))))
+    aristas = pd.DataFrame(
+        [(*orientar(str(u), str(v)), w) for u, v, w in G.edges(data='weight', default=1)], columns=['u', 'v', 'w']
+    )
+    h = hashlib.sha1()
+    h.update(b'D' if G.is_directed() else b'U')
+    h.update(np.sort(pd.util.hash_pandas_object(nodos, index=False).to_numpy()).tobytes())
+    if not aristas.empty:
+        h.update(np.sort(pd.util.hash_pandas_object(aristas, index=False).to_numpy()).tobytes())
+    return h.hexdigest()
 
 
 @st.cache_data
-def crear_red_bimodal(df, col_nodos_tipo1='Revista', col_nodos_tipo2='Colaborador'):
-    """Crea una red bimodal a partir de un DataFrame."""
+def crear_red_bimodal(df, col_nodos_tipo1='Revista', col_nodos_tipo2='Colaborador',
+                      min_contribuciones=1, min_revistas=1, min_peso_arista=1, nucleo_k=0):
+    """
+    Crea una red bimodal a partir de un DataFrame. El peso de cada arista es el número de
+    contribuciones del colaborador en la revista.
+
+    La poda se aplica con filtros de conteo vectorizados sobre la tabla de aristas, antes de crear
+    el grafo: se descartan los colaboradores con menos de 'min_contribuciones' contribuciones o
+    presentes en menos de 'min_revistas' revistas, las aristas con peso menor que 'min_peso_arista'
+    y, si 'nucleo_k' > 0, los nodos fuera del núcleo k. El resumen de lo descartado queda en
+    B.graph['poda'].
+    """
     B = nx.Graph()
     nodos1 = df[col_nodos_tipo1].dropna().unique()
     nodos2 = df[col_nodos_tipo2].dropna().unique()
+    aristas = df[[col_nodos_tipo1, col_nodos_tipo2]].dropna().groupby([col_nodos_tipo1, col_nodos_tipo2], sort=False).size().reset_index(name='weight')
+    num_aristas_inicial = len(aristas)
+
+    # Umbrales por colaborador, calculados sobre todas sus contribuciones
+    por_colaborador = aristas.groupby(col_nodos_tipo2)['weight'].agg(['sum', 'size'])
+    validos = por_colaborador.index[(por_colaborador['sum'] >= min_contribuciones) & (por_colaborador['size'] >= min_revistas)]
+    aristas = aristas[aristas[col_nodos_tipo2].isin(validos) & (aristas['weight'] >= min_peso_arista)]
+
+    # Núcleo k: se retiran por rondas los nodos con grado menor que k
+    if nucleo_k > 0:
+        while not aristas.empty:
+            grado1 = aristas[col_nodos_tipo1].map(aristas[col_nodos_tipo1].value_counts())
+            grado2 = aristas[col_nodos_tipo2].map(aristas[col_nodos_tipo2].value_counts())
+            conservar = (grado1 >= nucleo_k) & (grado2 >= nucleo_k)
+            if conservar.all():
+                break
+            aristas = aristas[conservar]
+        nodos1 = aristas[col_nodos_tipo1].unique()
+    if min_contribuciones > 1 or min_revistas > 1 or min_peso_arista > 1 or nucleo_k > 0:
+        nodos2 = aristas[col_nodos_tipo2].unique()
+
     B.add_nodes_from(nodos1, bipartite=0)
     B.add_nodes_from(nodos2, bipartite=1)
-    edges = df[[col_nodos_tipo1, col_nodos_tipo2]].dropna().to_numpy()
-    B.add_edges_from(edges)
+    B.add_weighted_edges_from(aristas.itertuples(index=False, name=None))
+    B.graph['poda'] = {
+        'Revistas': df[col_nodos_tipo1].nunique() - len(nodos1),
+        'Colaboradores': df[col_nodos_tipo2].nunique() - len(nodos2),
+        'Conexiones': num_aristas_inicial - len(aristas),
+    }
     return B
 
+@st.cache_data
+def crear_red_traducciones(df, col_traductor='Traductor', col_autor='Colaborador', col_traduccion='Traducción',
+                           col_idioma='Idioma', col_idioma_original='Idioma Original', traductores_excluidos=('Anónimo',)):
+    """
+    Crea una red dirigida y ponderada traductor → autor traducido a partir de las filas marcadas como
+    traducción. El peso de cada arista es el número de textos que el traductor tradujo de ese autor y,
+    si existen las columnas de idioma, el atributo 'idiomas' resume los pares 'original → destino'
+    (del más al menos frecuente). Todas las aristas salen de una única agrupación sobre las filas traducidas.
+    Cada nodo lleva el atributo 'tipo': 'Traductor', 'Autor traducido' o 'Traductor y autor'.
+    """
+    G = nx.DiGraph()
+    if not {col_traductor, col_autor}.issubset(df.columns):
+        return G
+
+    # Mismo criterio que analizar_traducciones para reconocer las traducciones
+    if col_traduccion in df.columns:
+        df = df[df[col_traduccion].astype(str).str.strip().str.lower() == 'sí']
+    df_trad = pd.DataFrame({
+        col_traductor: df[col_traductor].astype('string').str.strip(),
+        col_autor: df[col_autor].astype('string').str.strip(),
+    })
+    agregaciones = {'weight': (col_traductor, 'size')}
+    if {col_idioma, col_idioma_original}.issubset(df.columns):
+        origen, destino = df[col_idioma_original].astype('string'), df[col_idioma].astype('string')
+        df_trad['_par'] = (origen.fillna('?') + ' → ' + destino.fillna('?')).mask(origen.isna() & destino.isna())
+        agregaciones['idiomas'] = ('_par', lambda pares: ', '.join(pares.value_counts().index))
+    validas = df_trad[col_traductor].fillna('').ne('') & df_trad[col_autor].fillna('').ne('')
+    validas &= ~df_trad[col_traductor].isin(list(traductores_excluidos))
+    df_trad = df_trad[validas]
+    if df_trad.empty:
+        return G
+
+    aristas = df_trad.groupby([col_traductor, col_autor], sort=False).agg(**agregaciones).reset_index()
+    traductores, autores = set(aristas[col_traductor]), set(aristas[col_autor])
+    G.add_nodes_from(traductores - autores, tipo='Traductor')
+    G.add_nodes_from(autores - traductores, tipo='Autor traducido')
+    G.add_nodes_from(traductores & autores, tipo='Traductor y autor')
+    atributos = [c for c in ['weight', 'idiomas'] if c in aristas.columns]
+    G.add_edges_from(
+        (u, v, dict(zip(atributos, valores)))
+        for u, v, *valores in aristas[[col_traductor, col_autor] + atributos].itertuples(index=False, name=None)
+    )
+    return G
+
 # @st.cache_data
 # def calcular_metricas_red(_G, calcular_intermediacion=False):
 #     """
@@ -54,10 +162,11 @@ def crear_red_bimodal(df, col_nodos_tipo1='Revista', col_nodos_tipo2='Colaborado
 #     return metricas_globales, df_metricas_nodos.sort_values(by='Grado_Centralidad', ascending=False)
 
 @st.cache_data
-def calcular_metricas_red(_G, calcular_intermediacion=False):
+def calcular_metricas_red(_G, calcular_intermediacion=False, huella=None):
     """
     Calcula métricas clave de una red. Esta versión asegura que la columna 'Tipo'
     siempre se cree a partir de los atributos del nodo.
+    'huella' (ver calcular_huella_grafo) distingue la entrada en la caché, ya que el grafo no se hashea.
     """
     if _G.number_of_nodes() == 0:
         return {"Nodos": 0, "Conexiones": 0, "Densidad": 0}, pd.DataFrame()
@@ -80,22 +189,736 @@ def calcular_metricas_red(_G, calcular_intermediacion=False):
     })
     
     # --- LÓGICA CORREGIDA PARA LA COLUMNA 'Tipo' ---
-    # Ya no dependemos de nx.is_bipartite. Directamente usamos el atributo que
-    # asignamos al crear el grafo en 'crear_red_bimodal'.
-    tipos = {node: data.get('bipartite', -1) for node, data in _G.nodes(data=True)}
-    df_metricas_nodos['Tipo'] = df_metricas_nodos['Nodo'].map(tipos).map({0: 'Revista', 1: 'Colaborador', -1: 'Indefinido'})
+    # Ya no dependemos de nx.is_bipartite. Usamos el atributo 'tipo' si el constructor lo asignó
+    # (p. ej. 'crear_red_traducciones') y, si no, el atributo 'bipartite' de 'crear_red_bimodal'.
+    tipos_bipartitos = {0: 'Revista', 1: 'Colaborador'}
+    tipos = {node: data.get('tipo', tipos_bipartitos.get(data.get('bipartite', -1), 'Indefinido')) for node, data in _G.nodes(data=True)}
+    df_metricas_nodos['Tipo'] = df_metricas_nodos['Nodo'].map(tipos)
     # --- FIN DE LA CORRECCIÓN ---
     
     return metricas_globales, df_metricas_nodos.sort_values(by='Grado_Centralidad', ascending=False)
 
+METRICAS_EXTENDIDAS = ['PageRank', 'Vector_Propio', 'Nucleo_K', 'Clustering', 'Componente']
+
+def _pagerank_disperso(A, alfa=0.85, tolerancia=1e-10, max_iter=200):
+    """PageRank por iteración de potencias sobre la matriz de adyacencia dispersa (filas = origen)."""
+    n = A.shape[0]
+    grado_salida = np.asarray(A.sum(axis=1)).ravel()
+    inverso = np.divide(1.0, grado_salida, out=np.zeros(n), where=grado_salida > 0)
+    colgantes = grado_salida == 0
+    AT = A.T.tocsr()
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        x_nuevo = alfa * (AT @ (x * inverso)) + (alfa * x[colgantes].sum() + 1 - alfa) / n
+        if np.abs(x_nuevo - x).sum() < n * tolerancia:
+            return x_nuevo
+        x = x_nuevo
+    return x
+
+def _vector_propio_disperso(A, tolerancia=1e-8, max_iter=500):
+    """
+    Centralidad de vector propio por iteración de potencias sobre (A + I), igual que networkx:
+    el desplazamiento evita la oscilación en grafos bipartitos.
+    """
+    n = A.shape[0]
+    AT = A.T.tocsr()
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        x_nuevo = AT @ x + x
+        norma = np.linalg.norm(x_nuevo)
+        if norma == 0:
+            return np.zeros(n)
+        x_nuevo /= norma
+        if np.abs(x_nuevo - x).sum() < n * tolerancia:
+            return x_nuevo
+        x = x_nuevo
+    return x
+
+def _hits_disperso(A, tolerancia=1e-10, max_iter=500):
+    """
+    Puntuaciones de hub y autoridad (HITS) por iteración de potencias sobre la matriz ponderada.
+    Cada vector se normaliza para sumar 1, igual que networkx.
+    """
+    n = A.shape[0]
+    AT = A.T.tocsr()
+    h = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        h_nuevo = A @ (AT @ h)
+        maximo = h_nuevo.max()
+        if maximo == 0:
+            return np.zeros(n), np.zeros(n)
+        h_nuevo /= maximo
+        convergido = np.abs(h_nuevo - h).sum() < n * tolerancia
+        h = h_nuevo
+        if convergido:
+            break
+    a = AT @ h
+    return h / h.sum(), a / a.sum()
+
+def _nucleo_k_disperso(S):
+    """Número de núcleo (k-core) por eliminación sucesiva de nodos, en bloques vectorizados."""
+    n = S.shape[0]
+    grado = np.asarray(S.sum(axis=1)).ravel()
+    nucleo = np.zeros(n, dtype=np.int64)
+    vivo = np.ones(n, dtype=bool)
+    k = 0
+    while vivo.any():
+        k = max(k, int(grado[vivo].min()))
+        eliminar = vivo & (grado <= k)
+        while eliminar.any():
+            nucleo[eliminar] = k
+            vivo[eliminar] = False
+            grado = grado - S @ eliminar.astype(np.int64)
+            eliminar = vivo & (grado <= k)
+    return nucleo
+
+def _triangulos_por_nodo(S, aristas_por_bloque=20000):
+    """
+    Triángulos en los que participa cada nodo. Se cuentan los vecinos comunes de los extremos de cada
+    arista, por bloques de aristas, sin construir la matriz de caminos de longitud dos (S @ S).
+    """
+    filas, columnas = sparse.triu(S, k=1).nonzero()
+    triangulos = np.zeros(S.shape[0])
+    for inicio in range(0, len(filas), aristas_por_bloque):
+        u, v = filas[inicio:inicio + aristas_por_bloque], columnas[inicio:inicio + aristas_por_bloque]
+        comunes = np.asarray(S[u].multiply(S[v]).sum(axis=1)).ravel()
+        np.add.at(triangulos, u, comunes)
+        np.add.at(triangulos, v, comunes)
+    # Cada triángulo de un nodo se cuenta desde sus dos aristas
+    return triangulos / 2
+
+@st.cache_data
+def calcular_metricas_extendidas(_G, huella, metricas=tuple(METRICAS_EXTENDIDAS)):
+    """
+    Calcula en un solo lote, sobre la matriz de adyacencia dispersa del grafo, las métricas
+    seleccionadas de METRICAS_EXTENDIDAS: PageRank, centralidad de vector propio, número de núcleo k,
+    coeficiente de clustering local y componente conexa de cada nodo. Todas se obtienen con
+    operaciones vectorizadas (iteración de potencias y productos dispersos), sin recorrer nodos en Python.
+    La caché se indexa por la huella del grafo (ver calcular_huella_grafo).
+
+    Como en networkx, PageRank (con los pesos de las aristas) y el vector propio tienen en cuenta los
+    bucles (p. ej. una revista que figura también como colaboradora de sí misma), mientras que el núcleo k
+    y el clustering los ignoran: networkx no admite bucles en el núcleo k y no los cuenta en el clustering.
+
+    Returns:
+        pd.DataFrame: Columna 'Nodo' más una columna por métrica, lista para fusionar con df_metricas_nodos.
+    """
+    nodos = list(_G.nodes())
+    df_resultado = pd.DataFrame({'Nodo': nodos})
+    if not nodos or not metricas:
+        return df_resultado
+
+    A = nx.to_scipy_sparse_array(_G, nodelist=nodos, weight=None, format='csr').astype(np.float64)
+    # Versión simétrica, binaria y sin bucles para el núcleo k, el clustering y las componentes
+    S = ((A + A.T) > 0).astype(np.int64).tocsr() if _G.is_directed() else A.astype(np.int64)
+    S.setdiag(0)
+    S.eliminate_zeros()
+
+    if 'PageRank' in metricas:
+        df_resultado['PageRank'] = _pagerank_disperso(nx.to_scipy_sparse_array(_G, nodelist=nodos, weight='weight', format='csr').astype(np.float64))
+    if 'Vector_Propio' in metricas:
+        df_resultado['Vector_Propio'] = _vector_propio_disperso(A)
+    if 'Nucleo_K' in metricas:
+        df_resultado['Nucleo_K'] = _nucleo_k_disperso(S)
+    if 'Clustering' in metricas:
+        # Un grafo bipartito (como la red bimodal) no tiene triángulos: su clustering es siempre 0
+        if nx.is_bipartite(_G):
+            df_resultado['Clustering'] = np.zeros(len(nodos))
+        else:
+            grado = np.asarray(S.sum(axis=1)).ravel()
+            posibles = grado * (grado - 1) / 2
+            df_resultado['Clustering'] = np.divide(_triangulos_por_nodo(S), posibles, out=np.zeros(len(nodos)), where=posibles > 0)
+    if 'Componente' in metricas:
+        _, etiquetas = connected_components(S, directed=False)
+        # Se numeran las componentes de mayor a menor tamaño
+        tamanos = np.bincount(etiquetas)
+        orden = np.empty_like(tamanos)
+        orden[np.argsort(-tamanos, kind='stable')] = np.arange(len(tamanos))
+        df_resultado['Componente'] = orden[etiquetas]
+    return df_resultado
+
+@st.cache_data
+def calcular_hits(_G, huella):
+    """
+    Puntuaciones de hub y autoridad (HITS, con los pesos de las aristas) de cada nodo de un grafo
+    dirigido, como la red de traducciones. En un grafo no dirigido hubs y autoridades coinciden por
+    definición, así que solo se devuelve la columna 'Nodo'. La caché se indexa por la huella del grafo.
+
+    Returns:
+        pd.DataFrame: Columnas 'Nodo', 'Hub' y 'Autoridad', lista para fusionar con df_metricas_nodos.
+    """
+    nodos = list(_G.nodes())
+    df_resultado = pd.DataFrame({'Nodo': nodos})
+    if not nodos or not _G.is_directed():
+        return df_resultado
+    A_peso = nx.to_scipy_sparse_array(_G, nodelist=nodos, weight='weight', format='csr').astype(np.float64)
+    df_resultado['Hub'], df_resultado['Autoridad'] = _hits_disperso(A_peso)
+    return df_resultado
+
+@st.cache_data
+def calcular_metricas_ventanas_temporales(df, tamano_ventana, paso, col_nodos_tipo1='Revista', col_nodos_tipo2='Colaborador', col_ano='Año', calcular_modularidad=True):
+    """
+    Recorre los años con una ventana deslizante y devuelve una tabla de métricas por ventana.
+    El grafo bimodal se mantiene de forma incremental: en cada paso se añaden las aristas de
+    los años que entran y se retiran las de los años que salen, y los grados se actualizan
+    en el mismo recorrido en lugar de reconstruir la red para cada rango.
+    """
+    columnas_salida = ['Ventana', 'Año_Inicio', 'Año_Fin', 'Revistas', 'Colaboradores', 'Nodos', 'Conexiones',
+                       'Densidad', 'Grado_Medio', 'Grado_Maximo', 'Componente_Mayor', 'Modularidad']
+    df_aristas = df[[col_ano, col_nodos_tipo1, col_nodos_tipo2]].dropna()
+    if df_aristas.empty or tamano_ventana < 1 or paso < 1:
+        return pd.DataFrame(columns=columnas_salida)
+
+    # Contribuciones por (año, revista, colaborador): una sola agrupación para todo el recorrido
+    conteos = df_aristas.groupby([col_ano, col_nodos_tipo1, col_nodos_tipo2]).size()
+    aristas_por_ano = {
+        int(ano): list(zip(grupo.index.get_level_values(1), grupo.index.get_level_values(2), grupo.to_numpy()))
+        for ano, grupo in conteos.groupby(level=0)
+    }
+    ano_min, ano_max = min(aristas_por_ano), max(aristas_por_ano)
+
+    G = nx.Graph()
+    peso_aristas = {}  # Contribuciones activas por arista dentro de la ventana
+    grados = {}
+    tipos = {}
+    activos_por_tipo = {0: 0, 1: 0}
+
+    def _anadir_ano(ano):
+        for u, v, n in aristas_por_ano.get(ano, []):
+            if (u, v) in peso_aristas:
+                peso_aristas[(u, v)] += n
+                continue
+            peso_aristas[(u, v)] = n
+            for nodo, tipo in ((u, 0), (v, 1)):
+                if grados.get(nodo, 0) == 0:
+                    G.add_node(nodo, bipartite=tipo)
+                    tipos[nodo] = tipo
+                    activos_por_tipo[tipo] += 1
+                grados[nodo] = grados.get(nodo, 0) + 1
+            G.add_edge(u, v)
+
+    def _retirar_ano(ano):
+        for u, v, n in aristas_por_ano.get(ano, []):
+            peso_aristas[(u, v)] -= n
+            if peso_aristas[(u, v)] > 0:
+                continue
+            del peso_aristas[(u, v)]
+            G.remove_edge(u, v)
+            for nodo in (u, v):
+                grados[nodo] -= 1
+                if grados[nodo] == 0:
+                    G.remove_node(nodo)
+                    del grados[nodo]
+                    activos_por_tipo[tipos.pop(nodo)] -= 1
+
+    filas = []
+    anos_activos = set()
+    inicio = ano_min
+    while True:
+        fin = inicio + tamano_ventana - 1
+        anos_ventana = set(range(inicio, fin + 1))
+        for ano in sorted(anos_activos - anos_ventana):
+            _retirar_ano(ano)
+        for ano in sorted(anos_ventana - anos_activos):
+            _anadir_ano(ano)
+        anos_activos = anos_ventana
+
+        n, m = G.number_of_nodes(), G.number_of_edges()
+        componente_mayor = max((len(c) for c in nx.connected_components(G)), default=0)
+        modularidad = None
+        if calcular_modularidad and m > 0:
+            particion = community.louvain_communities(G, seed=123)
+            modularidad = community.modularity(G, particion)
+        filas.append({
+            'Ventana': f"{inicio}-{fin}", 'Año_Inicio': inicio, 'Año_Fin': fin,
+            'Revistas': activos_por_tipo[0], 'Colaboradores': activos_por_tipo[1],
+            'Nodos': n, 'Conexiones': m,
+            'Densidad': (2 * m / (n * (n - 1))) if n > 1 else 0,
+            'Grado_Medio': (2 * m / n) if n else 0,
+            'Grado_Maximo': max(grados.values(), default=0),
+            'Componente_Mayor': componente_mayor,
+            'Modularidad': modularidad,
+        })
+        if fin >= ano_max:
+            break
+        inicio += paso
+
+    return pd.DataFrame(filas, columns=columnas_salida)
+
+@st.cache_data
+def calcular_linea_tiempo_anual(df, col_nodos_tipo1='Revista', col_nodos_tipo2='Colaborador', col_ano='Año'):
+    """
+    Estadísticas de la red bimodal para cada año, sin construir ningún grafo: todas salen de conteos
+    agrupados sobre la tabla de aristas únicas (año, revista, colaborador). Densidad y grado medio
+    usan las mismas fórmulas que calcular_metricas_ventanas_temporales. Los años sin publicaciones
+    dentro del intervalo aparecen con todo a cero, para que la línea de tiempo no una los huecos.
+
+    Returns:
+        pd.DataFrame: Año, Revistas, Colaboradores, Nodos, Conexiones, Densidad, Grado_Medio y
+        Prop_Multirrevista (proporción de colaboradores activos en más de una revista ese año).
+    """
+    columnas_salida = ['Año', 'Revistas', 'Colaboradores', 'Nodos', 'Conexiones', 'Densidad', 'Grado_Medio', 'Prop_Multirrevista']
+    aristas = df[[col_ano, col_nodos_tipo1, col_nodos_tipo2]].dropna().drop_duplicates()
+    if aristas.empty:
+        return pd.DataFrame(columns=columnas_salida)
+
+    por_ano = aristas.groupby(col_ano)
+    linea = pd.DataFrame({
+        'Revistas': por_ano[col_nodos_tipo1].nunique(),
+        'Colaboradores': por_ano[col_nodos_tipo2].nunique(),
+        'Conexiones': por_ano.size(),
+    })
+    revistas_por_colaborador = aristas.groupby([col_ano, col_nodos_tipo2]).size()
+    linea['Multirrevista'] = revistas_por_colaborador.gt(1).groupby(level=0).sum()
+    linea.index = linea.index.astype(int)
+    linea = linea.reindex(range(linea.index.min(), linea.index.max() + 1), fill_value=0)
+
+    n, m = linea['Revistas'] + linea['Colaboradores'], linea['Conexiones']
+    linea['Prop_Multirrevista'] = (linea['Multirrevista'] / linea['Colaboradores']).where(linea['Colaboradores'] > 0, 0.0)
+    linea['Nodos'] = n
+    linea['Densidad'] = (2 * m / (n * (n - 1))).where(n > 1, 0.0)
+    linea['Grado_Medio'] = (2 * m / n).where(n > 0, 0.0)
+    linea = linea.rename_axis('Año').reset_index()
+    return linea[columnas_salida]
+
+MEDIDAS_SIMILITUD = {'Compartidos': 'Colaboradores compartidos', 'Jaccard': 'Jaccard', 'Coseno': 'Coseno'}
+
+@st.cache_data
+def calcular_similitud_revistas(df, col_revista='Revista', col_colaborador='Colaborador', col_ano='Año', rango_anos=None):
+    """
+    Matrices de similitud revista × revista según sus colaboradores: número de colaboradores
+    compartidos, índice de Jaccard y similitud del coseno. Las tres salen de un único producto
+    disperso M·Mᵀ de la matriz de incidencia binaria revista–colaborador. 'rango_anos' (inicio, fin)
+    restringe las contribuciones a esa ventana.
+
+    Returns:
+        dict: {medida: pd.DataFrame cuadrado indexado por revista} para cada clave de MEDIDAS_SIMILITUD.
+    """
+    if rango_anos is not None and col_ano in df.columns:
+        df = df[df[col_ano].between(rango_anos[0], rango_anos[1])]
+    pares = df[[col_revista, col_colaborador]].dropna().drop_duplicates()
+    if pares.empty:
+        return {medida: pd.DataFrame() for medida in MEDIDAS_SIMILITUD}
+
+    codigos_revista, revistas = pd.factorize(pares[col_revista], sort=True)
+    codigos_colab, colaboradores = pd.factorize(pares[col_colaborador])
+    M = sparse.csr_matrix(
+        (np.ones(len(pares)), (codigos_revista, codigos_colab)), shape=(len(revistas), len(colaboradores))
+    )
+    compartidos = (M @ M.T).toarray()
+    tamano = np.diag(compartidos).copy()
+    union = tamano[:, None] + tamano[None, :] - compartidos
+    jaccard = np.divide(compartidos, union, out=np.zeros_like(compartidos), where=union > 0)
+    norma = np.sqrt(np.outer(tamano, tamano))
+    coseno = np.divide(compartidos, norma, out=np.zeros_like(compartidos), where=norma > 0)
+
+    indice = pd.Index(revistas, name=col_revista)
+    return {
+        'Compartidos': pd.DataFrame(compartidos.astype(np.int64), index=indice, columns=indice),
+        'Jaccard': pd.DataFrame(jaccard, index=indice, columns=indice),
+        'Coseno': pd.DataFrame(coseno, index=indice, columns=indice),
+    }
+
+def ordenar_matriz_por_agrupamiento(df_matriz):
+    """
+    Reordena filas y columnas de una matriz de similitud con un agrupamiento jerárquico
+    (enlace promedio sobre la distancia 1 - similitud normalizada), para que los bloques de
+    revistas parecidas queden contiguos en el mapa de calor.
+    """
+    if len(df_matriz) < 3:
+        return df_matriz
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+    valores = df_matriz.to_numpy(dtype=float)
+    maximo = valores.max()
+    distancia = 1 - (valores / maximo if maximo > 0 else valores)
+    np.fill_diagonal(distancia, 0)
+    orden = leaves_list(linkage(squareform(np.clip(distancia, 0, None), checks=False), method='average'))
+    return df_matriz.iloc[orden, orden]
+
+def obtener_revistas_similares(df_matriz, k=5):
+    """
+    Devuelve, para cada revista, las 'k' revistas más similares (sin contarse a sí misma), en
+    formato largo: Revista, Revista_Similar, Similitud y Posicion. La selección es vectorizada
+    con argpartition sobre toda la matriz.
+    """
+    columnas_salida = ['Revista', 'Revista_Similar', 'Similitud', 'Posicion']
+    n = len(df_matriz)
+    if n < 2:
+        return pd.DataFrame(columns=columnas_salida)
+    k = min(k, n - 1)
+    valores = df_matriz.to_numpy(dtype=float).copy()
+    np.fill_diagonal(valores, -np.inf)
+    mejores = np.argpartition(-valores, k - 1, axis=1)[:, :k]
+    puntuaciones = np.take_along_axis(valores, mejores, axis=1)
+    orden = np.argsort(-puntuaciones, axis=1, kind='stable')
+    mejores = np.take_along_axis(mejores, orden, axis=1)
+    nombres = df_matriz.index.to_numpy()
+    return pd.DataFrame({
+        'Revista': np.repeat(nombres, k),
+        'Revista_Similar': nombres[mejores.ravel()],
+        'Similitud': np.take_along_axis(puntuaciones, orden, axis=1).ravel(),
+        'Posicion': np.tile(np.arange(1, k + 1), n),
+    })
+
+def _disposicion_fuerzas(num_nodos, aristas, semilla=123, iteraciones=100, muestra_repulsion=256):
+    """
+    Disposición de Fruchterman-Reingold vectorizada con numpy. La repulsión de cada iteración se
+    estima frente a una muestra aleatoria (con semilla) de nodos, de modo que el coste por iteración
+    es O(n·muestra) en lugar de O(n²); la atracción se acumula por aristas con np.bincount.
+    """
+    rng = np.random.default_rng(semilla)
+    pos = rng.random((num_nodos, 2))
+    k = np.sqrt(1.0 / num_nodos)
+    temperatura = 0.1
+    enfriamiento = temperatura / (iteraciones + 1)
+    u, v = aristas[:, 0], aristas[:, 1]
+    for _ in range(iteraciones):
+        if num_nodos <= muestra_repulsion:
+            muestra, factor = np.arange(num_nodos), 1.0
+        else:
+            muestra, factor = rng.choice(num_nodos, muestra_repulsion, replace=False), num_nodos / muestra_repulsion
+        # Repulsión k²/d en forma matricial: sum_j w_ij (p_i - p_j) = p_i·sum_j w_ij - W·p
+        pos_muestra = pos[muestra]
+        cuadrados = (pos ** 2).sum(axis=1)
+        pesos = cuadrados[:, None] + cuadrados[muestra][None, :] - 2 * (pos @ pos_muestra.T)
+        np.maximum(pesos, 1e-4, out=pesos)
+        np.divide(k * k, pesos, out=pesos)
+        desplazamiento = (pos * pesos.sum(axis=1)[:, None] - pesos @ pos_muestra) * factor
+
+        delta_aristas = pos[u] - pos[v]
+        fuerza = delta_aristas * (np.sqrt((delta_aristas ** 2).sum(axis=1)) / k)[:, None]
+        for eje in range(2):
+            desplazamiento[:, eje] += np.bincount(v, fuerza[:, eje], num_nodos) - np.bincount(u, fuerza[:, eje], num_nodos)
+        desplazamiento -= (pos - pos.mean(axis=0)) * k  # Gravedad débil para no dispersar componentes aisladas
+
+        longitud = np.maximum(np.sqrt((desplazamiento ** 2).sum(axis=1)), 1e-4)
+        pos += desplazamiento * (np.minimum(longitud, temperatura) / longitud)[:, None]
+        temperatura -= enfriamiento
+    return pos
+
+@st.cache_data
+def calcular_disposicion_red(_G, huella, metodo='fuerzas', semilla=123):
+    """
+    Calcula una sola vez en el servidor las coordenadas de los nodos (disposición dirigida por
+    fuerzas vectorizada o espectral) con una semilla fija para que sea reproducible.
+    La caché se indexa por la huella del grafo (ver calcular_huella_grafo).
+
+    Returns:
+        pd.DataFrame: Columnas ['Nodo', 'x', 'y'] con coordenadas en el rango [-1, 1].
+    """
+    nodos = list(_G.nodes())
+    if not nodos:
+        return pd.DataFrame(columns=['Nodo', 'x', 'y'])
+    if metodo == 'espectral' and len(nodos) > 2:
+        G_no_dirigido = _G.to_undirected(as_view=True) if _G.is_directed() else _G
+        posiciones = nx.spectral_layout(G_no_dirigido)
+        coordenadas = np.array([posiciones[n] for n in nodos])
+    else:
+        indice = {nodo: i for i, nodo in enumerate(nodos)}
+        aristas = np.array([(indice[a], indice[b]) for a, b in _G.edges() if a != b], dtype=np.int64).reshape(-1, 2)
+        coordenadas = _disposicion_fuerzas(len(nodos), aristas, semilla=semilla)
+    coordenadas = coordenadas - coordenadas.mean(axis=0)
+    coordenadas = coordenadas / max(np.abs(coordenadas).max(), 1e-9)
+    return pd.DataFrame({'Nodo': nodos, 'x': coordenadas[:, 0], 'y': coordenadas[:, 1]})
+
+def reducir_red_nivel_detalle(G, df_metricas_nodos, max_nodos, criterio='Grado_Centralidad', comunidades=None, df_posiciones=None):
+    """
+    Reduce una red para su visualización (nivel de detalle). Conserva las revistas y los 'max_nodos'
+    nodos mejor clasificados según 'criterio' ('Grado_Centralidad', 'Intermediacion' o 'Nucleo_K') y
+    agrupa el resto en nodos agregados "Otros": por comunidad si se proporciona 'comunidades', o por el
+    vecino conservado mejor clasificado (normalmente su revista). Las aristas agregadas suman los pesos
+    ('weight') de las originales. Todo el cálculo se hace sobre tablas de aristas, sin recorrer los nodos uno a uno.
+
+    Si se pasa 'df_posiciones' (ver calcular_disposicion_red), se añaden las columnas 'x' e 'y':
+    los nodos conservados mantienen su posición y cada nodo agregado se sitúa en el centroide de sus miembros.
+
+    Returns:
+        tuple: (G_reducido, df_metricas_reducido). Si la red ya cabe en el límite, se devuelven los originales.
+    """
+    if df_posiciones is not None and df_metricas_nodos is not None and not df_metricas_nodos.empty:
+        df_metricas_nodos = df_metricas_nodos.drop(columns=['x', 'y'], errors='ignore').merge(df_posiciones, on='Nodo', how='left')
+    if df_metricas_nodos is None or df_metricas_nodos.empty or G.number_of_nodes() <= max_nodos:
+        return G, df_metricas_nodos
+
+    df_nodos = df_metricas_nodos.copy()
+    if criterio not in df_nodos.columns:
+        if criterio != 'Nucleo_K':
+            raise ValueError(f"Criterio de nivel de detalle desconocido: '{criterio}'.")
+        G_sin_lazos = G.copy()
+        G_sin_lazos.remove_edges_from(nx.selfloop_edges(G_sin_lazos))
+        df_nodos['Nucleo_K'] = df_nodos['Nodo'].map(nx.core_number(G_sin_lazos))
+
+    columnas_orden = [criterio] + (['Grado_Centralidad'] if criterio != 'Grado_Centralidad' else [])
+    df_nodos = df_nodos.sort_values(by=columnas_orden, ascending=False).reset_index(drop=True)
+    df_nodos['_rango'] = np.arange(len(df_nodos))
+    conservar = df_nodos['_rango'].lt(max_nodos) | df_nodos.get('Tipo', pd.Series(index=df_nodos.index, dtype=object)).eq('Revista')
+    nodos_conservados = df_nodos.loc[conservar, 'Nodo']
+    df_descartados = df_nodos.loc[~conservar, [c for c in ['Nodo', 'Grado_Centralidad', 'x', 'y'] if c in df_nodos.columns]]
+    rango = dict(zip(df_nodos['Nodo'], df_nodos['_rango']))
+
+    aristas = pd.DataFrame([(u, v, w) for u, v, w in G.edges(data='weight', default=1)], columns=['u', 'v', 'weight'])
+    if aristas.empty:
+        return G.subgraph(nodos_conservados).copy(), df_nodos.loc[conservar].drop(columns='_rango')
+    conservado = set(nodos_conservados)
+
+    # Grupo de cada nodo descartado: su comunidad o su vecino conservado mejor clasificado
+    if comunidades:
+        grupo = df_descartados['Nodo'].map(comunidades).map(lambda c: f"Otros · Comunidad {c}", na_action='ignore')
+    else:
+        grupo = pd.Series(np.nan, index=df_descartados.index, dtype=object)
+    sin_grupo = grupo.isna()
+    if sin_grupo.any():
+        ambos_sentidos = pd.concat([aristas, aristas.rename(columns={'u': 'v', 'v': 'u'})], ignore_index=True)
+        candidatos = ambos_sentidos[~ambos_sentidos['u'].isin(conservado) & ambos_sentidos['v'].isin(conservado)].copy()
+        candidatos['_rango'] = candidatos['v'].map(rango)
+        ancla = candidatos.sort_values('_rango').drop_duplicates('u').set_index('u')['v']
+        grupo[sin_grupo] = df_descartados.loc[sin_grupo, 'Nodo'].map(ancla).map(lambda a: f"Otros · {a}", na_action='ignore')
+    grupo = grupo.fillna("Otros")
+    representante = dict(zip(df_descartados['Nodo'], grupo))
+
+    # Aristas agregadas: cada extremo descartado se sustituye por su nodo "Otros"
+    aristas['u'] = aristas['u'].map(lambda n: representante.get(n, n))
+    aristas['v'] = aristas['v'].map(lambda n: representante.get(n, n))
+    aristas = aristas[aristas['u'] != aristas['v']]
+    if not G.is_directed():
+        invertir = aristas['u'].astype(str) > aristas['v'].astype(str)
+        aristas.loc[invertir, ['u', 'v']] = aristas.loc[invertir, ['v', 'u']].to_numpy()
+    aristas_agregadas = aristas.groupby(['u', 'v'], sort=False)['weight'].sum().reset_index()
+
+    agregaciones = {'Grado_Centralidad': ('Grado_Centralidad', 'sum'), 'Miembros': ('Grado_Centralidad', 'size')}
+    if 'x' in df_descartados.columns:
+        agregaciones.update(x=('x', 'mean'), y=('y', 'mean'))
+    df_agregados = (
+        df_descartados.assign(Nodo=grupo.to_numpy())
+        .groupby('Nodo', sort=False)
+        .agg(**agregaciones)
+        .reset_index()
+        .assign(Tipo='Agregado')
+    )
+
+    G_reducido = G.__class__()
+    G_reducido.add_nodes_from((n, G.nodes[n]) for n in nodos_conservados)
+    G_reducido.add_nodes_from(df_agregados['Nodo'], bipartite=-1)
+    G_reducido.add_weighted_edges_from(aristas_agregadas.itertuples(index=False, name=None))
+    # Las aristas entre nodos conservados mantienen sus atributos originales (p. ej. 'idiomas')
+    G_reducido.add_edges_from(G.subgraph(nodos_conservados).edges(data=True))
+
+    df_metricas_reducido = pd.concat(
+        [df_nodos.loc[conservar].drop(columns='_rango'), df_agregados], ignore_index=True
+    )
+    return G_reducido, df_metricas_reducido
+
 @st.cache_data
 def proyectar_red_unimodal(_B, nodos_a_proyectar):
     """Proyecta una red bimodal en una red unimodal."""
     return nx.bipartite.projected_graph(_B, nodos_a_proyectar)
 
 @st.cache_data
-def detectar_comunidades_louvain(_G_unimodal):
-    """Detecta comunidades en un grafo unimodal usando el algoritmo de Louvain."""
+def proyectar_red_ponderada(_B, huella, tipo_bipartito=1):
+    """
+    Proyecta la red bimodal sobre los nodos con bipartite == 'tipo_bipartito' (1: colaboradores,
+    0: revistas). El peso de cada arista es el número de vecinos compartidos y se obtiene con un
+    único producto disperso de la matriz de incidencia, sin recorrer pares de nodos en Python.
+    """
+    nodos = [n for n, d in _B.nodes(data=True) if d.get('bipartite') == tipo_bipartito]
+    otros = [n for n, d in _B.nodes(data=True) if d.get('bipartite') != tipo_bipartito]
+    P = nx.Graph()
+    P.add_nodes_from(nodos, bipartite=tipo_bipartito)
+    if not nodos or not otros:
+        return P
+    M = nx.bipartite.biadjacency_matrix(_B, row_order=nodos, column_order=otros, weight=None, format='csr')
+    M.data[:] = 1
+    compartidos = sparse.triu(M @ M.T, k=1).tocoo()
+    nombres = np.asarray(nodos, dtype=object)
+    P.add_weighted_edges_from(zip(nombres[compartidos.row], nombres[compartidos.col], compartidos.data.tolist()))
+    return P
+
+@st.cache_data
+def detectar_comunidades_louvain(_G_unimodal, huella=None):
+    """
+    Detecta comunidades en un grafo unimodal usando el algoritmo de Louvain.
+    'huella' (ver calcular_huella_grafo) distingue la entrada en la caché, ya que el grafo no se hashea.
+    """
     comunidades = community.louvain_communities(_G_unimodal, seed=123)
     mapa_comunidad = {nodo: i for i, com in enumerate(comunidades) for nodo in com}
-    return mapa_comunidad
\ No newline at end of file
+    return mapa_comunidad
+
+
+# --- Análisis de estabilidad de comunidades (pool de procesos) ---
+@st.cache_resource(max_entries=4)
+def _pool_estabilidad(num_trabajadores):
+    """
+    Pool de procesos reutilizado entre análisis (y sesiones). Usa 'forkserver' en lugar de 'fork' (el
+    predeterminado en Linux), porque hacer fork del servidor de Streamlit, que tiene varios hilos, puede
+    dejar bloqueados a los hijos; el forkserver precarga components/trabajador_comunidades.py, así que los
+    trabajadores no vuelven a importar nada al arrancar. Los trabajadores se crean a medida que llegan tareas.
+    """
+    contexto = multiprocessing.get_context('forkserver')
+    contexto.set_forkserver_preload(['components.trabajador_comunidades'])
+    return ProcessPoolExecutor(max_workers=num_trabajadores, mp_context=contexto)
+
+@st.cache_data
+def analizar_estabilidad_comunidades(_G_unimodal, huella, semillas=(123,), resoluciones=(1.0,), incluir_propagacion=False, max_trabajadores=None):
+    """
+    Ejecuta Louvain (y opcionalmente propagación de etiquetas) para cada combinación de semilla y
+    resolución en procesos paralelos. Devuelve la curva de modularidad, una partición de consenso
+    y la estabilidad de asignación de cada nodo. La caché se indexa por la huella del grafo.
+
+    Returns:
+        tuple: (df_curva_modularidad, mapa_consenso, df_estabilidad)
+    """
+    nodos = list(_G_unimodal.nodes())
+    if not nodos:
+        return pd.DataFrame(), {}, pd.DataFrame()
+    indice = {nodo: i for i, nodo in enumerate(nodos)}
+    aristas = np.array([(indice[u], indice[v]) for u, v in _G_unimodal.edges()], dtype=np.int64).reshape(-1, 2)
+
+    tareas = [('Louvain', s, r) for r in resoluciones for s in semillas]
+    if incluir_propagacion:
+        tareas += [('Propagación de etiquetas', s, 1.0) for s in semillas]
+
+    resultados = None
+    if len(tareas) > 1:
+        num_trabajadores = min(max_trabajadores or os.cpu_count() or 1, len(tareas))
+        try:
+            resultados = list(_pool_estabilidad(num_trabajadores).map(
+                trabajador_comunidades.ejecutar_particion, *zip(*[(huella, len(nodos), aristas) + tarea for tarea in tareas])
+            ))
+        except BrokenProcessPool:
+            # Un trabajador murió (o no pudo arrancar): se descarta el pool y se calcula en este proceso
+            _pool_estabilidad.clear()
+    if resultados is None:
+        G_ids = trabajador_comunidades.construir_grafo(len(nodos), aristas)
+        resultados = [trabajador_comunidades.particionar(G_ids, *tarea) for tarea in tareas]
+
+    df_curva = pd.DataFrame(
+        [r[:5] for r in resultados],
+        columns=['Metodo', 'Semilla', 'Resolucion', 'Modularidad', 'Num_Comunidades']
+    )
+    etiquetas = np.vstack([r[5] for r in resultados])  # (ejecuciones, nodos)
+
+    # Consenso: Louvain sobre el grafo de co-asignación, conservando las aristas cuyos extremos
+    # comparten comunidad en la mayoría de ejecuciones y ponderándolas por esa fracción
+    coasignacion = (etiquetas[:, aristas[:, 0]] == etiquetas[:, aristas[:, 1]]).mean(axis=0)
+    mayoritarias = coasignacion > 0.5
+    G_consenso = nx.Graph()
+    G_consenso.add_nodes_from(range(len(nodos)))
+    G_consenso.add_weighted_edges_from(zip(aristas[mayoritarias, 0].tolist(), aristas[mayoritarias, 1].tolist(), coasignacion[mayoritarias].tolist()))
+    consenso = np.empty(len(nodos), dtype=np.int64)
+    componentes = sorted(community.louvain_communities(G_consenso, weight='weight', seed=123), key=len, reverse=True)
+    for i, comp in enumerate(componentes):
+        consenso[list(comp)] = i
+
+    # Estabilidad: fracción de ejecuciones en que la comunidad del nodo se corresponde
+    # (por máximo solapamiento) con su comunidad de consenso
+    num_consenso = len(componentes)
+    estables = np.zeros(len(nodos))
+    for fila in etiquetas:
+        solapamiento = np.bincount(fila * num_consenso + consenso, minlength=(fila.max() + 1) * num_consenso)
+        correspondencia = solapamiento.reshape(-1, num_consenso).argmax(axis=1)
+        estables += correspondencia[fila] == consenso
+    estabilidad = estables / len(etiquetas)
+
+    mapa_consenso = dict(zip(nodos, consenso.tolist()))
+    df_estabilidad = pd.DataFrame({
+        'Nodo': nodos, 'ID_Comunidad': consenso, 'Estabilidad': estabilidad
+    }).sort_values(by=['ID_Comunidad', 'Estabilidad'], ascending=[True, False])
+    return df_curva, mapa_consenso, df_estabilidad
+
+
+# --- Consultas locales: red ego y caminos mínimos ---
+@st.cache_resource(max_entries=8)
+def construir_indice_consultas(_G, huella, max_recorridos=64):
+    """
+    Prepara un índice para consultas locales sobre la red: la adyacencia en arrays enteros (CSR),
+    la posición de cada nodo y una caché LRU de recorridos en anchura por nodo de origen, de modo
+    que las consultas repetidas desde el mismo nodo no vuelven a recorrer el grafo. Las redes dirigidas
+    se recorren sin tener en cuenta el sentido de las aristas.
+    Se guarda con st.cache_resource porque la caché de recorridos se actualiza en cada consulta.
+    """
+    nodos = list(_G.nodes())
+    S = nx.to_scipy_sparse_array(_G, nodelist=nodos, weight=None, format='csr')
+    if _G.is_directed():
+        S = (S + S.T).tocsr()
+    S.setdiag(0)
+    S.eliminate_zeros()
+    return {
+        'grafo': _G,
+        'nodos': nodos,
+        'posicion': {n: i for i, n in enumerate(nodos)},
+        'indptr': S.indptr.astype(np.int64),
+        'indices': S.indices.astype(np.int64),
+        'recorridos': OrderedDict(),
+        'max_recorridos': max_recorridos,
+        'cerrojo': threading.Lock(),
+    }
+
+def _recorrido_anchura(indice, origen):
+    """
+    Devuelve (distancia, padre) para todos los nodos desde 'origen' (-1 si no es alcanzable).
+    Cada nivel se expande de una vez con operaciones vectorizadas sobre los arrays CSR.
+    """
+    with indice['cerrojo']:
+        if origen in indice['recorridos']:
+            indice['recorridos'].move_to_end(origen)
+            return indice['recorridos'][origen]
+
+    indptr, indices = indice['indptr'], indice['indices']
+    n = len(indptr) - 1
+    distancia = np.full(n, -1, dtype=np.int64)
+    padre = np.full(n, -1, dtype=np.int64)
+    distancia[origen] = 0
+    frontera = np.array([origen], dtype=np.int64)
+    nivel = 0
+    while frontera.size:
+        nivel += 1
+        inicios = indptr[frontera]
+        longitudes = indptr[frontera + 1] - inicios
+        desplazamientos = np.repeat(inicios - np.cumsum(longitudes) + longitudes, longitudes) + np.arange(longitudes.sum())
+        vecinos, padres = indices[desplazamientos], np.repeat(frontera, longitudes)
+        nuevos = distancia[vecinos] < 0
+        frontera, primeros = np.unique(vecinos[nuevos], return_index=True)
+        distancia[frontera] = nivel
+        padre[frontera] = padres[nuevos][primeros]
+
+    with indice['cerrojo']:
+        indice['recorridos'][origen] = (distancia, padre)
+        while len(indice['recorridos']) > indice['max_recorridos']:
+            indice['recorridos'].popitem(last=False)
+    return distancia, padre
+
+def consultar_red_ego(indice, nodo, radio=2):
+    """
+    Devuelve la red ego de 'nodo': el subgrafo inducido por los nodos a 'radio' saltos o menos.
+
+    Returns:
+        tuple: (G_ego, df_distancias con 'Nodo' y 'Distancia'). Si el nodo no existe, un grafo vacío.
+    """
+    G = indice['grafo']
+    if nodo not in indice['posicion']:
+        return G.__class__(), pd.DataFrame(columns=['Nodo', 'Distancia'])
+    distancia, _ = _recorrido_anchura(indice, indice['posicion'][nodo])
+    cercanos = np.flatnonzero((distancia >= 0) & (distancia <= radio))
+    cercanos = cercanos[np.argsort(distancia[cercanos], kind='stable')]
+    nombres = [indice['nodos'][i] for i in cercanos]
+    df_distancias = pd.DataFrame({'Nodo': nombres, 'Distancia': distancia[cercanos]})
+    return G.subgraph(nombres).copy(), df_distancias
+
+def consultar_camino_minimo(indice, origen, destino):
+    """
+    Devuelve un camino mínimo (lista de nodos de 'origen' a 'destino') reconstruido a partir del
+    recorrido en anchura cacheado desde 'origen'. Lista vacía si alguno no existe o no están conectados.
+    """
+    posicion = indice['posicion']
+    if origen not in posicion or destino not in posicion:
+        return []
+    _, padre = _recorrido_anchura(indice, posicion[origen])
+    actual, inicio = posicion[destino], posicion[origen]
+    if actual != inicio and padre[actual] < 0:
+        return []
+    camino = [actual]
+    while actual != inicio:
+        actual = padre[actual]
+        camino.append(actual)
+    return [indice['nodos'][i] for i in reversed(camino)]
@@ -0,0 +1,136 @@
+import gzip
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+import pandas as pd
+from pandas.api import types as tipos_pd
+
+# Formatos de exportación disponibles: etiqueta -> (extensión, tipo MIME)
+FORMATOS_EXPORTACION = {
+    'GEXF (Gephi)': ('gexf', 'application/xml'),
+    'GraphML': ('graphml', 'application/xml'),
+    'CSV comprimido (aristas)': ('aristas.csv.gz', 'application/gzip'),
+    'CSV comprimido (nodos)': ('nodos.csv.gz', 'application/gzip'),
+}
+_LINEAS_POR_BLOQUE = 5000
+# Entidades adicionales para que el texto sea válido también dentro de atributos entre comillas dobles
+_ENTIDADES_ATRIBUTO = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#9;'}
+
+
+def preparar_tabla_nodos(G, df_metricas_nodos=None, comunidades=None):
+    """
+    Tabla de nodos para exportar: un id entero por nodo, la etiqueta y los atributos disponibles
+    (tipo, centralidades, métricas extendidas e 'ID_Comunidad' si se pasan las comunidades).
+    """
+    df_nodos = pd.DataFrame({'Nodo': list(G.nodes())})
+    if df_metricas_nodos is not None and not df_metricas_nodos.empty:
+        df_nodos = df_nodos.merge(df_metricas_nodos.drop(columns=['x', 'y'], errors='ignore').drop_duplicates('Nodo'), on='Nodo', how='left')
+    if comunidades:
+        df_nodos['ID_Comunidad'] = df_nodos['Nodo'].map(comunidades).astype('Int64')
+    df_nodos.insert(0, 'Id', np.arange(len(df_nodos)))
+    return df_nodos
+
+
+def preparar_tabla_aristas(G, df_nodos):
+    """Tabla de aristas con los ids enteros de 'df_nodos' y el peso ('weight', 1 si no existe)."""
+    posicion = pd.Series(df_nodos['Id'].to_numpy(), index=df_nodos['Nodo'])
+    aristas = pd.DataFrame(list(G.edges(data='weight', default=1)), columns=['Origen', 'Destino', 'Peso'])
+    aristas['Origen'] = aristas['Origen'].map(posicion)
+    aristas['Destino'] = aristas['Destino'].map(posicion)
+    return aristas
+
+
+def _tipo_atributo(serie):
+    """Tipo de atributo GEXF/GraphML correspondiente al dtype de la columna."""
+    if tipos_pd.is_bool_dtype(serie):
+        return 'boolean'
+    if tipos_pd.is_integer_dtype(serie):
+        return 'long'
+    if tipos_pd.is_float_dtype(serie):
+        return 'double'
+    return 'string'
+
+
+def _valores_texto(serie):
+    """
+    Convierte una columna a texto escapado para XML (válido como contenido y como valor de atributo
+    entre comillas dobles); los valores ausentes quedan como None.
+    """
+    ausentes = serie.isna().to_numpy()
+    if tipos_pd.is_bool_dtype(serie):
+        texto = serie.map({True: 'true', False: 'false'})
+    else:
+        texto = serie.astype(str).map(lambda valor: escape(valor, _ENTIDADES_ATRIBUTO))
+    return [None if a else t for a, t in zip(ausentes, texto.tolist())]
+
+
+def _escribir_por_bloques(destino, lineas):
+    """Escribe en 'destino' (binario) las líneas de un generador, en bloques de tamaño acotado."""
+    bloque = []
+    for linea in lineas:
+        bloque.append(linea)
+        if len(bloque) >= _LINEAS_POR_BLOQUE:
+            destino.write(''.join(bloque).encode('utf-8'))
+            bloque = []
+    if bloque:
+        destino.write(''.join(bloque).encode('utf-8'))
+
+
+def _lineas_gexf(df_nodos, df_aristas, dirigida):
+    columnas = [c for c in df_nodos.columns if c not in ('Id', 'Nodo')]
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<gexf xmlns="http://www.gexf.net/1.2draft" version="1.2">\n'
+    yield f'<graph defaultedgetype="{"directed" if dirigida else "undirected"}" mode="static">\n'
+    yield '<attributes class="node">\n'
+    for i, c in enumerate(columnas):
+        yield f'<attribute id="{i}" title={quoteattr(c)} type="{_tipo_atributo(df_nodos[c])}"/>\n'
+    yield '</attributes>\n<nodes>\n'
+    valores = [_valores_texto(df_nodos[c]) for c in columnas]
+    etiquetas = _valores_texto(df_nodos['Nodo'])
+    for fila, (id_nodo, etiqueta) in enumerate(zip(df_nodos['Id'].tolist(), etiquetas)):
+        atributos = ''.join(f'<attvalue for="{i}" value="{v[fila]}"/>' for i, v in enumerate(valores) if v[fila] is not None)
+        yield f'<node id="{id_nodo}" label="{etiqueta}"><attvalues>{atributos}</attvalues></node>\n'
+    yield '</nodes>\n<edges>\n'
+    for i, (u, v, w) in enumerate(df_aristas.itertuples(index=False, name=None)):
+        yield f'<edge id="{i}" source="{u}" target="{v}" weight="{w}"/>\n'
+    yield '</edges>\n</graph>\n</gexf>\n'
+
+
+def _lineas_graphml(df_nodos, df_aristas, dirigida):
+    columnas = [c for c in df_nodos.columns if c != 'Id']
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    for i, c in enumerate(columnas):
+        nombre = 'label' if c == 'Nodo' else c
+        yield f'<key id="d{i}" for="node" attr.name={quoteattr(nombre)} attr.type="{_tipo_atributo(df_nodos[c])}"/>\n'
+    yield '<key id="peso" for="edge" attr.name="weight" attr.type="double"/>\n'
+    yield f'<graph edgedefault="{"directed" if dirigida else "undirected"}">\n'
+    valores = [_valores_texto(df_nodos[c]) for c in columnas]
+    for fila, id_nodo in enumerate(df_nodos['Id'].tolist()):
+        datos = ''.join(f'<data key="d{i}">{v[fila]}</data>' for i, v in enumerate(valores) if v[fila] is not None)
+        yield f'<node id="n{id_nodo}">{datos}</node>\n'
+    for u, v, w in df_aristas.itertuples(index=False, name=None):
+        yield f'<edge source="n{u}" target="n{v}"><data key="peso">{w}</data></edge>\n'
+    yield '</graph>\n</graphml>\n'
+
+
+def exportar_red(G, destino, formato, df_metricas_nodos=None, comunidades=None):
+    """
+    Escribe la red en 'destino' (un archivo binario abierto) en el formato indicado, una de las claves
+    de FORMATOS_EXPORTACION. Los documentos GEXF y GraphML se generan línea a línea a partir de las
+    tablas de nodos y aristas y se vuelcan por bloques, sin construir el documento completo en memoria;
+    los CSV se escriben comprimidos con gzip directamente sobre el destino.
+    """
+    df_nodos = preparar_tabla_nodos(G, df_metricas_nodos, comunidades)
+    extension = FORMATOS_EXPORTACION[formato][0]
+    if extension == 'nodos.csv.gz':
+        with gzip.GzipFile(fileobj=destino, mode='wb', compresslevel=6) as comprimido:
+            df_nodos.to_csv(comprimido, index=False, encoding='utf-8')
+        return
+    df_aristas = preparar_tabla_aristas(G, df_nodos)
+    if extension == 'aristas.csv.gz':
+        with gzip.GzipFile(fileobj=destino, mode='wb', compresslevel=6) as comprimido:
+            df_aristas.to_csv(comprimido, index=False, encoding='utf-8')
+    elif extension == 'gexf':
+        _escribir_por_bloques(destino, _lineas_gexf(df_nodos, df_aristas, G.is_directed()))
+    else:
+        _escribir_por_bloques(destino, _lineas_graphml(df_nodos, df_aristas, G.is_directed()))
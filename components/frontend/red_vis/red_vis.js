@@ -0,0 +1,92 @@
+// Dibuja el grafo a partir del payload compacto generado por preparar_datos_red
+// (components/visualization_networks.py). Implementa directamente el protocolo
+// de mensajes de los componentes de Streamlit, sin dependencias de compilación.
+(function () {
+    "use strict";
+
+    var contenedor = document.getElementById("red");
+    var info = document.getElementById("info");
+    var red = null;
+    var huellaActual = null;
+    var datos = null;
+
+    function enviar(tipo, extra) {
+        var mensaje = { isStreamlitMessage: true, type: tipo };
+        for (var clave in extra) { mensaje[clave] = extra[clave]; }
+        window.parent.postMessage(mensaje, "*");
+    }
+
+    function escapar(texto) {
+        return String(texto).replace(/[&<>"]/g, function (c) {
+            return { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;" }[c];
+        });
+    }
+
+    // Las descripciones emergentes se componen en el cliente a partir de los arrays
+    function descripcion(i) {
+        var lineas = ["<b>" + escapar(datos.l[i]) + "</b>", "Tipo: " + escapar(datos.tn[datos.t[i]])];
+        lineas.push("Centralidad: " + datos.g[i].toFixed(3));
+        if (datos.b && datos.b[i] > 0) { lineas.push("Intermediación: " + datos.b[i].toFixed(3)); }
+        if (datos.n && datos.n[i] > 0) { lineas.push("Nodos agrupados: " + datos.n[i]); }
+        if (datos.k && datos.k[i] >= 0) { lineas.push("Comunidad: " + datos.k[i]); }
+        return lineas.join("<br>");
+    }
+
+    function descripcionArista(j) {
+        var lineas = [escapar(datos.l[datos.e[2 * j]]) + (datos.d ? " → " : " — ") + escapar(datos.l[datos.e[2 * j + 1]])];
+        if (datos.w && datos.w[j] !== null) { lineas.push("Peso: " + datos.w[j]); }
+        if (datos.ei && datos.ei[j]) { lineas.push("Idiomas: " + escapar(datos.ei[j])); }
+        return lineas.join("<br>");
+    }
+
+    function mostrar(html, evento) {
+        info.innerHTML = html;
+        info.style.left = (evento.pointer.DOM.x + 12) + "px";
+        info.style.top = (evento.pointer.DOM.y + 12) + "px";
+        info.style.display = "block";
+    }
+
+    function dibujar(d) {
+        datos = d;
+        var conPosiciones = Array.isArray(d.x);
+        var nodos = new Array(d.l.length);
+        for (var i = 0; i < d.l.length; i++) {
+            var nodo = { id: i, label: d.l[i], value: d.s[i], color: d.p[d.c[i]], shape: d.tn[d.t[i]] === "Agregado" ? "diamond" : "dot" };
+            if (conPosiciones && d.x[i] !== null) { nodo.x = d.x[i]; nodo.y = d.y[i]; }
+            nodos[i] = nodo;
+        }
+        var aristas = new Array(d.e.length / 2);
+        for (var j = 0; j < aristas.length; j++) {
+            var arista = { id: j, from: d.e[2 * j], to: d.e[2 * j + 1] };
+            if (d.w) { arista.value = d.w[j]; }
+            aristas[j] = arista;
+        }
+        var opciones = {
+            nodes: { font: { color: "white" }, scaling: { min: 10, max: 30 } },
+            edges: { color: { inherit: true }, smooth: false, arrows: { to: { enabled: !!d.d } } },
+            interaction: { hover: true, tooltipDelay: 100, hideEdgesOnDrag: true },
+            physics: { enabled: !!d.f, stabilization: { iterations: 200 } },
+            layout: { improvedLayout: !conPosiciones }
+        };
+        if (red) { red.destroy(); }
+        red = new vis.Network(contenedor, { nodes: new vis.DataSet(nodos), edges: new vis.DataSet(aristas) }, opciones);
+        red.on("hoverNode", function (evento) { mostrar(descripcion(evento.node), evento); });
+        red.on("hoverEdge", function (evento) { mostrar(descripcionArista(evento.edge), evento); });
+        red.on("blurNode", function () { info.style.display = "none"; });
+        red.on("blurEdge", function () { info.style.display = "none"; });
+    }
+
+    window.addEventListener("message", function (evento) {
+        if (!evento.data || evento.data.type !== "streamlit:render") { return; }
+        var args = evento.data.args;
+        contenedor.style.height = args.altura + "px";
+        enviar("streamlit:setFrameHeight", { height: args.altura });
+        // Streamlit reenvía los argumentos en cada ejecución: solo se redibuja si el grafo cambió
+        if (args.datos.h !== huellaActual) {
+            huellaActual = args.datos.h;
+            dibujar(args.datos);
+        }
+    });
+
+    enviar("streamlit:componentReady", { apiVersion: 1 });
+})();
@@ -0,0 +1,343 @@
+# components/geo.py
+# Utilidades geográficas compartidas por components/maps.py y components/data_processing_maps.py.
+import json
+import os
+import re
+import tempfile
+from contextlib import suppress
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+SIN_REGION = "Sin Región Asignada"
+
+# Tabla de referencia de países (Natural Earth). Solo se leen las columnas que usa la aplicación;
+# la versión compacta precompilada evita analizar el archivo completo (170+ columnas) al arrancar.
+RUTA_WORLD = 'data/world.csv'
+RUTA_WORLD_COMPACTO = 'data/world_compacto.csv'
+# Columnas de nombres y códigos con las que se construye el índice de alias (por orden de prioridad)
+COLUMNAS_ALIAS_WORLD = [
+    'NAME_ES', 'ISO_A3_EH', 'NAME', 'NAME_LONG', 'NAME_EN', 'FORMAL_EN', 'ADMIN', 'NAME_ALT',
+    'NAME_FR', 'NAME_DE', 'NAME_IT', 'NAME_PT', 'ISO_A3', 'ISO_A2_EH'
+]
+# LABEL_X/LABEL_Y: punto de etiqueta de Natural Earth (lon, lat), usado como centroide del país
+COLUMNAS_WORLD = ['NAME_ES', 'ISO_A3_EH', 'REGION_WB', 'LABEL_X', 'LABEL_Y'] + COLUMNAS_ALIAS_WORLD[2:]
+# Nombres históricos y variantes definidos por el usuario: columnas 'Alias' e 'ISO_A3'
+RUTA_ALIAS_PAISES = 'data/alias_paises.csv'
+# Geometría local para los mapas sin conexión: tolerancia de simplificación (grados) por nivel.
+# Los GeoJSON se escriben en 'static/' (servido por Streamlit con server.enableStaticServing),
+# de modo que el navegador los descarga una vez y los guarda en su caché.
+NIVELES_SIMPLIFICACION = {'Detallada': 0.0, 'Media': 0.15, 'Ligera': 0.4}
+DIRECTORIO_GEOMETRIA = os.path.join('static', 'geo')
+URL_GEOMETRIA = 'app/static/geo'
+
+
+def normalizar_nombres_pais(serie):
+    """
+    Normaliza nombres de países para compararlos: sin acentos ni caracteres invisibles (p. ej.
+    espacios de ancho cero), en minúsculas (casefold) y con la puntuación reducida a un espacio.
+    """
+    texto = serie.astype('string').str.normalize('NFKD')
+    texto = texto.str.replace('[\u0300-\u036f\u200b-\u200d\u2060\ufeff]', '', regex=True)
+    texto = texto.str.casefold().str.replace(r'[\W_]+', ' ', regex=True).str.strip()
+    return texto.mask(texto == '')
+
+
+def construir_indice_alias(tabla, df_alias=None):
+    """
+    Índice de alias: nombre normalizado -> posición de la fila en 'tabla'. Se construye con todas las
+    columnas de COLUMNAS_ALIAS_WORLD presentes (los nombres en español tienen prioridad ante
+    coincidencias) y con los alias de 'df_alias' ('Alias', 'ISO_A3'), que prevalecen sobre los anteriores.
+    """
+    columnas = [c for c in COLUMNAS_ALIAS_WORLD if c in tabla.columns]
+    largo = tabla[columnas].reset_index(drop=True).melt(value_name='Alias', ignore_index=False)
+    largo = largo[largo['Alias'].astype(str) != '-99']
+    claves = pd.Series(largo.index.to_numpy(), index=normalizar_nombres_pais(largo['Alias']).to_numpy())
+    claves = claves[claves.index.notna()]
+    indice = claves[~claves.index.duplicated(keep='first')]
+
+    if df_alias is not None and not df_alias.empty:
+        destino = normalizar_nombres_pais(df_alias['ISO_A3']).map(indice)
+        extra = pd.Series(destino.to_numpy(), index=normalizar_nombres_pais(df_alias['Alias']).to_numpy()).dropna().astype(indice.dtype)
+        indice = pd.concat([extra[~extra.index.duplicated()], indice])
+        indice = indice[~indice.index.duplicated(keep='first')]
+    return indice
+
+
+def unir_referencia_geografica(df_datos, tabla, col_pais_datos, columnas_tabla, indice_alias=None):
+    """
+    Añade a 'df_datos' las 'columnas_tabla' de la fila de referencia de cada país. La resolución se
+    hace sobre los valores distintos de la columna de país (normalizados y buscados en el índice de
+    alias) y se difunde a las filas con un solo 'map'.
+
+    Returns:
+        tuple: (df_unido, df_no_encontrados con 'Pais' y 'Filas', de mayor a menor número de filas).
+    """
+    if indice_alias is None:
+        indice_alias = construir_indice_alias(tabla)
+    distintos = pd.Series(df_datos[col_pais_datos].dropna().unique())
+    claves = normalizar_nombres_pais(distintos)
+    fila_por_pais = pd.Series(claves.map(indice_alias).to_numpy(), index=distintos.to_numpy())
+    filas = df_datos[col_pais_datos].map(fila_por_pais)
+    # Los valores vacíos (sin texto tras normalizar) cuentan como ausentes, no como no encontrados
+    con_nombre = df_datos[col_pais_datos].isin(distintos[claves.notna().to_numpy()]).to_numpy()
+
+    encontrados = filas.notna().to_numpy()
+    posiciones = filas.fillna(0).astype(np.int64).to_numpy()
+    df_unido = df_datos.copy()
+    for columna in columnas_tabla:
+        valores = tabla[columna].to_numpy()[posiciones]
+        df_unido[columna] = pd.Series(valores, index=df_datos.index).where(encontrados)
+
+    no_encontrados = df_datos.loc[~encontrados & con_nombre, col_pais_datos].value_counts()
+    df_no_encontrados = no_encontrados.rename_axis('Pais').reset_index(name='Filas')
+    return df_unido, df_no_encontrados
+
+
+def obtener_centroides(tabla, col_id='ISO_A3_EH'):
+    """Centroide (punto de etiqueta) de cada país: DataFrame indexado por 'col_id' con 'lon' y 'lat'."""
+    if not {'LABEL_X', 'LABEL_Y'}.issubset(tabla.columns):
+        return pd.DataFrame(columns=['lon', 'lat'])
+    centroides = tabla.loc[tabla[col_id] != '-99', [col_id, 'LABEL_X', 'LABEL_Y']].dropna()
+    return centroides.drop_duplicates(col_id).set_index(col_id).rename(columns={'LABEL_X': 'lon', 'LABEL_Y': 'lat'})
+
+
+@st.cache_resource(max_entries=4)
+def _leer_referencia_geografica(ruta, marca_tiempo, columnas, ruta_alias=None, marca_tiempo_alias=None):
+    """Lee la tabla y construye las búsquedas; las marcas de tiempo forman parte de la clave de caché."""
+    tabla = pd.read_csv(ruta, usecols=list(columnas), encoding='utf-8')
+    df_alias = pd.read_csv(ruta_alias, encoding='utf-8') if ruta_alias else None
+    nombres = tabla['NAME_ES']
+    return {
+        'tabla': tabla,
+        'iso_por_nombre': dict(zip(nombres, tabla['ISO_A3_EH'])),
+        'region_por_nombre': dict(zip(nombres, tabla['REGION_WB'])),
+        'indice_alias': construir_indice_alias(tabla, df_alias),
+        'centroides': obtener_centroides(tabla),
+    }
+
+
+def cargar_referencia_geografica(ruta=RUTA_WORLD, ruta_compacta=RUTA_WORLD_COMPACTO, columnas=tuple(COLUMNAS_WORLD), ruta_alias=RUTA_ALIAS_PAISES):
+    """
+    Devuelve la referencia geográfica compartida por todas las sesiones del proceso:
+    {'tabla': DataFrame con 'columnas', 'iso_por_nombre': dict, 'region_por_nombre': dict,
+    'indice_alias': ver construir_indice_alias, con los alias de 'ruta_alias' si existe,
+    'centroides': ver obtener_centroides}.
+    Usa la versión compacta si existe, contiene las columnas y no es más antigua que la completa;
+    si no, lee de la completa solo esas columnas. La caché se invalida cuando cambia la fecha de
+    modificación del archivo leído. El resultado es compartido: no debe modificarse.
+
+    Raises:
+        FileNotFoundError: Si no existe ninguno de los dos archivos.
+    """
+    origen = ruta
+    if os.path.exists(ruta_compacta) and (not os.path.exists(ruta) or os.path.getmtime(ruta_compacta) >= os.path.getmtime(ruta)):
+        if set(columnas).issubset(pd.read_csv(ruta_compacta, nrows=0).columns):
+            origen = ruta_compacta
+    if not os.path.exists(origen):
+        raise FileNotFoundError(origen)
+    if ruta_alias and not os.path.exists(ruta_alias):
+        ruta_alias = None
+    return _leer_referencia_geografica(
+        origen, os.path.getmtime(origen), tuple(columnas), ruta_alias, os.path.getmtime(ruta_alias) if ruta_alias else None
+    )
+
+
+def generar_referencia_compacta(ruta=RUTA_WORLD, ruta_compacta=RUTA_WORLD_COMPACTO, columnas=tuple(COLUMNAS_WORLD)):
+    """Regenera la versión compacta de la tabla de referencia a partir del archivo completo."""
+    pd.read_csv(ruta, usecols=list(columnas), encoding='utf-8')[list(columnas)].to_csv(ruta_compacta, index=False, encoding='utf-8')
+
+
+# --- Geometría local (GeoJSON simplificado a partir de la columna WKT de world.csv) ---
+def _leer_poligonos_wkt(texto):
+    """Lee un POLYGON o MULTIPOLYGON en WKT como lista de polígonos, cada uno una lista de anillos (arrays n x 2)."""
+    tipo, _, cuerpo = texto.strip().partition(' ')
+    if tipo.upper() == 'POLYGON':
+        cuerpo = f"({cuerpo.strip()})"
+    return [
+        [np.array(anillo.replace(',', ' ').split(), dtype=float).reshape(-1, 2) for anillo in re.findall(r'\(([^()]*)\)', bloque)]
+        for bloque in re.findall(r'\(\s*(\([^()]*\)(?:\s*,\s*\([^()]*\))*)\s*\)', cuerpo)
+    ]
+
+
+def _douglas_peucker(puntos, tolerancia):
+    """Máscara de los puntos que conserva Douglas-Peucker sobre una polilínea abierta."""
+    conservar = np.zeros(len(puntos), dtype=bool)
+    conservar[[0, -1]] = True
+    pendientes = [(0, len(puntos) - 1)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        if fin - inicio < 2:
+            continue
+        a, b = puntos[inicio], puntos[fin]
+        tramo = puntos[inicio + 1:fin] - a
+        direccion = b - a
+        longitud = np.hypot(*direccion)
+        if longitud == 0:
+            distancias = np.hypot(tramo[:, 0], tramo[:, 1])
+        else:
+            distancias = np.abs(tramo[:, 0] * direccion[1] - tramo[:, 1] * direccion[0]) / longitud
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia:
+            medio = inicio + 1 + k
+            conservar[medio] = True
+            pendientes += [(inicio, medio), (medio, fin)]
+    return conservar
+
+
+def _simplificar_anillo(anillo, tolerancia):
+    """Simplifica un anillo cerrado; devuelve None si queda degenerado (menos de 4 puntos)."""
+    if tolerancia <= 0 or len(anillo) < 5:
+        return anillo
+    # Se parte el anillo por el punto más alejado del primero para que Douglas-Peucker tenga dos extremos distintos
+    lejano = int(np.argmax(np.hypot(*(anillo - anillo[0]).T)))
+    conservar = np.concatenate([_douglas_peucker(anillo[:lejano + 1], tolerancia)[:-1], _douglas_peucker(anillo[lejano:], tolerancia)])
+    resultado = anillo[conservar]
+    return resultado if len(resultado) >= 4 else None
+
+
+def _orientar_anillo(anillo, exterior):
+    """Orienta el anillo como espera d3-geo (Plotly): exterior en sentido horario, huecos en antihorario."""
+    x, y = anillo[:, 0], anillo[:, 1]
+    area = np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])
+    return anillo[::-1] if (area > 0) == exterior else anillo
+
+
+def construir_geojson_mundo(tabla, col_id='ISO_A3_EH', col_nombre='NAME_ES', col_geometria='geometry', tolerancia=0.0, decimales=3):
+    """
+    Convierte la tabla de referencia (con geometría WKT) en un FeatureCollection cuyo 'id' es 'col_id'.
+    Los anillos se simplifican con 'tolerancia' (grados) y las coordenadas se redondean a 'decimales';
+    los polígonos que desaparecen al simplificar se omiten, salvo el mayor de cada país. Los países sin
+    código ('-99') reciben un id propio para no colisionar entre sí.
+    """
+    entidades = []
+    for i, (codigo, nombre, wkt) in enumerate(tabla[[col_id, col_nombre, col_geometria]].itertuples(index=False)):
+        if not isinstance(wkt, str):
+            continue
+        poligonos_wkt = _leer_poligonos_wkt(wkt)
+        poligonos = []
+        for poligono in poligonos_wkt:
+            exterior = _simplificar_anillo(poligono[0], tolerancia)
+            if exterior is None:
+                continue
+            huecos = [h for h in (_simplificar_anillo(h, tolerancia) for h in poligono[1:]) if h is not None]
+            poligonos.append([_orientar_anillo(exterior, True)] + [_orientar_anillo(h, False) for h in huecos])
+        if not poligonos and poligonos_wkt:
+            mayor = max(poligonos_wkt, key=lambda p: len(p[0]))
+            poligonos = [[_orientar_anillo(mayor[0], True)]]
+        coordenadas = [[np.round(anillo, decimales).tolist() for anillo in poligono] for poligono in poligonos]
+        entidades.append({
+            'type': 'Feature',
+            'id': codigo if codigo != '-99' else f"-99-{i}",
+            'properties': {'nombre': nombre},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': coordenadas},
+        })
+    return {'type': 'FeatureCollection', 'features': entidades}
+
+
+@st.cache_resource(max_entries=len(NIVELES_SIMPLIFICACION))
+def _preparar_geometria_mundo(ruta, marca_tiempo, nivel, servir_estatico):
+    """
+    Construye (y, si procede, escribe en 'static/') el GeoJSON de un nivel; la marca de tiempo invalida la caché.
+    El archivo se escribe en uno temporal y se renombra, para que nadie lea uno a medio escribir; si no se
+    puede escribir (despliegue de solo lectura), se usa el FeatureCollection en memoria.
+    """
+    geojson = construir_geojson_mundo(
+        pd.read_csv(ruta, usecols=['ISO_A3_EH', 'NAME_ES', 'geometry'], encoding='utf-8'),
+        tolerancia=NIVELES_SIMPLIFICACION[nivel]
+    )
+    ids = [f['id'] for f in geojson['features']]
+    if servir_estatico:
+        nombre_archivo = f"mundo_{nivel.lower()}.geojson"
+        ruta_temporal = None
+        try:
+            os.makedirs(DIRECTORIO_GEOMETRIA, exist_ok=True)
+            descriptor, ruta_temporal = tempfile.mkstemp(dir=DIRECTORIO_GEOMETRIA, prefix=f".{nombre_archivo}.", suffix='.tmp')
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+                json.dump(geojson, archivo, separators=(',', ':'))
+            os.chmod(ruta_temporal, 0o644)
+            os.replace(ruta_temporal, os.path.join(DIRECTORIO_GEOMETRIA, nombre_archivo))
+            return {'geojson': f"{URL_GEOMETRIA}/{nombre_archivo}", 'ids': ids}
+        except OSError:
+            if ruta_temporal is not None:
+                with suppress(OSError):
+                    os.remove(ruta_temporal)
+    return {'geojson': geojson, 'ids': ids}
+
+
+def cargar_geometria_mundo(nivel='Media', ruta=RUTA_WORLD):
+    """
+    Geometría local del mundo para dibujar los mapas sin depender de la que Plotly descarga de su CDN:
+    {'geojson': URL del archivo estático (si Streamlit sirve 'static/') o el FeatureCollection embebido,
+    'ids': códigos ISO_A3_EH de todas las entidades}. Se construye una vez por nivel y proceso.
+
+    Raises:
+        FileNotFoundError: Si no existe el archivo con la columna de geometría.
+    """
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(ruta)
+    return _preparar_geometria_mundo(ruta, os.path.getmtime(ruta), nivel, bool(st.get_option('server.enableStaticServing')))
+
+
+def codificar_paises(serie_paises):
+    """
+    Devuelve (codigos, paises_distintos) para una columna de países. Si la columna ya es categórica
+    se reutilizan sus códigos sin recorrerla; los valores ausentes tienen código -1.
+    """
+    if isinstance(serie_paises.dtype, pd.CategoricalDtype):
+        return serie_paises.cat.codes.to_numpy(), pd.Index(serie_paises.cat.categories)
+    codigos, paises = pd.factorize(serie_paises)
+    return codigos, pd.Index(paises)
+
+
+def mapear_por_pais(serie_paises, funcion, valor_ausente=np.nan):
+    """
+    Aplica 'funcion' una sola vez por país distinto y difunde el resultado a todas las filas
+    mediante los códigos categóricos, en lugar de llamarla fila a fila.
+    """
+    codigos, paises = codificar_paises(serie_paises)
+    tabla = np.array([funcion(p) for p in paises] + [valor_ausente], dtype=object)
+    return pd.Series(tabla[codigos], index=serie_paises.index)
+
+
+def construir_tabla_regiones(paises, regiones_base, pais_central=None, paises_a_aislar=None, grupos_personalizados=None):
+    """
+    Tabla de consulta país → región final con la jerarquía de clasificación: país central,
+    países aislados, grupos personalizados y, por último, la región base.
+    Se evalúa sobre los países distintos (unos 200 como máximo), no sobre las filas.
+    """
+    paises = pd.Index(paises)
+    pais_a_grupo = {pais: nombre for nombre, lista in (grupos_personalizados or {}).items() for pais in lista}
+    region = pd.Series(regiones_base, index=paises, dtype=object)
+    grupo = pd.Series(paises.map(pais_a_grupo), index=paises, dtype=object)
+    region = region.where(grupo.isna(), grupo)
+    aislados = paises.isin(paises_a_aislar or [])
+    region[aislados] = paises[aislados]
+    if pais_central is not None:
+        region[paises == pais_central] = f"CENTRAL: {pais_central}"
+    return region
+
+
+def aplicar_clasificacion_dinamica(df_enriquecido, col_pais_datos='PaisOrigen', pais_central=None, paises_a_aislar=None, grupos_personalizados=None):
+    """
+    Aplica la jerarquía de clasificación regional sobre un DataFrame que ya tiene una 'Region_Base'.
+    La clasificación se calcula una vez por país distinto y se difunde a las filas como columna
+    mediante los códigos de país, así que cambiar un grupo solo recalcula la tabla de países.
+    """
+    codigos, paises = codificar_paises(df_enriquecido[col_pais_datos])
+    if 'Region_Base' in df_enriquecido.columns:
+        region_base_filas = df_enriquecido['Region_Base'].to_numpy()
+        # Región base de cada país: la de su primera aparición
+        _, primeras = np.unique(codigos, return_index=True)
+        codigos_presentes = codigos[primeras]
+        region_base = np.full(len(paises), np.nan, dtype=object)
+        region_base[codigos_presentes[codigos_presentes >= 0]] = region_base_filas[primeras[codigos_presentes >= 0]]
+    else:
+        region_base_filas = np.full(len(df_enriquecido), SIN_REGION, dtype=object)
+        region_base = np.full(len(paises), SIN_REGION, dtype=object)
+
+    tabla = construir_tabla_regiones(paises, region_base, pais_central, paises_a_aislar, grupos_personalizados)
+    region = tabla.to_numpy()[np.maximum(codigos, 0)] if len(paises) else np.empty(len(codigos), dtype=object)
+    # Las filas sin país conservan su propia región base
+    region = np.where(codigos >= 0, region, region_base_filas)
+    return df_enriquecido.assign(Region=region)
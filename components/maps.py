@@ -1,55 +1,44 @@
 # components/data_processing_maps.py
 import pandas as pd
 import streamlit as st
+from components.geo import aplicar_clasificacion_dinamica, unir_referencia_geografica
+from components.conteo_aproximado import construir_sketches, combinar_sketches, estimar_distintos
 
-def enriquecer_con_geo_info(df_datos, df_world, col_pais_datos='PaisOrigen', col_pais_world='NAME_ES', col_iso_world='ISO_A3', col_region_world='REGION_WB'):
+def enriquecer_con_geo_info(df_datos, df_world, col_pais_datos='PaisOrigen', col_pais_world='NAME_ES', col_iso_world='ISO_A3', col_region_world='REGION_WB', indice_alias=None):
     """
     Toma el dataframe de datos y lo enriquece con el geocode y la región base desde el archivo world.csv.
-    Esta es la función de estandarización principal.
+    Esta es la función de estandarización principal. Los países se resuelven con el índice de alias
+    (nombres en varios idiomas, códigos ISO y nombres históricos, sin distinguir acentos ni mayúsculas;
+    ver components/geo.py) y la columna de país se sustituye por el nombre canónico de la referencia, de
+    modo que cada geocode tiene un solo nombre (p. ej. 'Inglaterra' y 'Escocia' pasan a 'Reino Unido').
+    Los que no se encuentran quedan en df_enriquecido.attrs['paises_no_encontrados'] como diccionario
+    {país: filas} (un DataFrame en attrs rompería los concat/astype de pandas).
     """
     if col_pais_datos not in df_datos.columns:
         st.warning(f"Advertencia: La columna de origen '{col_pais_datos}' no se encuentra en el DataFrame.")
         return pd.DataFrame()
 
-    df_enriquecido = pd.merge(
-        df_datos,
-        df_world[[col_pais_world, col_iso_world, col_region_world]],
-        left_on=col_pais_datos,
-        right_on=col_pais_world,
-        how='left'
+    df_enriquecido, df_no_encontrados = unir_referencia_geografica(
+        df_datos, df_world, col_pais_datos, [col_pais_world, col_iso_world, col_region_world], indice_alias
     )
     df_enriquecido.rename(columns={col_iso_world: 'geocode', col_region_world: 'Region_Base'}, inplace=True)
-    
-    paises_no_mapeados = df_enriquecido[df_enriquecido['geocode'].isnull()][col_pais_datos].unique()
-    if len(paises_no_mapeados) > 0:
-        print(f"Advertencia: Países no encontrados en 'world.csv': {list(paises_no_mapeados)}")
-        
-    return df_enriquecido.dropna(subset=['geocode'])
+    df_enriquecido = df_enriquecido.dropna(subset=['geocode'])
+    if col_pais_world != col_pais_datos:
+        df_enriquecido[col_pais_datos] = df_enriquecido.pop(col_pais_world)
+    df_enriquecido.attrs['paises_no_encontrados'] = dict(zip(df_no_encontrados['Pais'], df_no_encontrados['Filas'].astype(int)))
+    return df_enriquecido
 
-def aplicar_clasificacion_dinamica(df_enriquecido, col_pais_datos='PaisOrigen', pais_central=None, paises_a_aislar=None, grupos_personalizados=None):
+def calcular_metricas_por_region(df, col_region='Region', col_colaborador='Colaborador', aproximado=False):
     """
-    Aplica la jerarquía de clasificación regional sobre un DataFrame que ya tiene una 'Region_Base'.
+    Calcula el número de colaboradores únicos y colaboraciones totales por región. Con 'aproximado'
+    los colaboradores únicos se estiman con sketches HyperLogLog (ver components/conteo_aproximado.py).
     """
-    if paises_a_aislar is None: paises_a_aislar = []
-    if grupos_personalizados is None: grupos_personalizados = {}
-
-    pais_a_grupo_personalizado = {pais: nombre_grupo for nombre_grupo, paises in grupos_personalizados.items() for pais in paises}
-
-    def asignar_region_final(row):
-        pais_actual = row[col_pais_datos]
-        if pd.notna(pais_actual):
-            if pais_actual == pais_central: return f"CENTRAL: {pais_actual}"
-            if pais_actual in paises_a_aislar: return pais_actual
-            if pais_actual in pais_a_grupo_personalizado: return pais_a_grupo_personalizado[pais_actual]
-        return row.get('Region_Base', "Sin Región Asignada")
-
-    df_resultado = df_enriquecido.copy()
-    df_resultado['Region'] = df_resultado.apply(asignar_region_final, axis=1)
-    return df_resultado
-
-def calcular_metricas_por_region(df, col_region='Region', col_colaborador='Colaborador'):
-    """Calcula el número de colaboradores únicos y colaboraciones totales por región."""
     if col_region not in df.columns or col_colaborador not in df.columns: return pd.DataFrame()
+    if aproximado:
+        metricas_region = _resumir_aproximado(df, [col_region], col_colaborador).rename(
+            columns={'Colaboradores': 'Colaboradores_Unicos', 'Contribuciones': 'Colaboraciones_Totales'}
+        )[[col_region, 'Colaboradores_Unicos', 'Colaboraciones_Totales']]
+        return metricas_region.sort_values(by='Colaboraciones_Totales', ascending=False)
     metricas_region = df.groupby(col_region).agg(
         Colaboradores_Unicos=(col_colaborador, 'nunique'),
         Colaboraciones_Totales=(col_colaborador, 'size')
@@ -62,4 +51,204 @@ def calcular_distribucion_geo_variable(df, col_categorica, valor_seleccionado, c
     df_filtrado = df[df[col_categorica] == valor_seleccionado]
     if df_filtrado.empty: return pd.DataFrame()
     resultado = df_filtrado.groupby([col_geocodigo, col_pais]).size().reset_index(name='Valor')
-    return resultado.sort_values(by='Valor', ascending=False)
\ No newline at end of file
+    return resultado.sort_values(by='Valor', ascending=False)
+
+# --- Cubo geográfico compartido por las pestañas de mapas ---
+def _resumir_aproximado(df, claves, col_colaborador, sketches=None):
+    """Contribuciones exactas y colaboradores únicos estimados (HyperLogLog) por grupo de 'claves'."""
+    sketches = construir_sketches(df, claves, col_colaborador) if sketches is None else sketches
+    estimados = sketches['grupos'].assign(Colaboradores=estimar_distintos(sketches).astype(int))
+    tabla = df.groupby(claves).size().reset_index(name='Contribuciones')
+    return tabla.merge(estimados, on=claves, how='left').fillna({'Colaboradores': 0}).astype({'Colaboradores': int})
+
+@st.cache_data
+def construir_cubo_geo(df_enriquecido, col_pais='PaisOrigen', col_colaborador='Colaborador', columnas_categoricas=('Tipología', 'Sexo', 'Revista'), col_fecha='Fecha Publicación', aproximado=False):
+    """
+    Resume una sola vez (por estado de filtros) el DataFrame enriquecido en un cubo pequeño:
+      - 'paises': por (geocode, país, Region_Base), contribuciones y colaboradores únicos.
+      - 'pares': pares distintos (geocode, país, colaborador), para contar colaboradores únicos
+        exactos al reagrupar países en regiones.
+      - 'categorias': {columna: tabla por (valor, geocode, país) con contribuciones y colaboradores únicos}.
+      - 'temporal': contribuciones por (Año, geocode, país), si existe la columna de fecha.
+      - 'colaboradores_ano': pares distintos (Año, colaborador), para contar colaboradores por año o década.
+    Todas las pestañas se responden agregando este cubo, sin volver a recorrer las filas.
+
+    Con 'aproximado' los colaboradores únicos se estiman con sketches HyperLogLog (error típico en
+    components/conteo_aproximado.error_relativo_hll): en lugar de 'pares' y 'colaboradores_ano' se guardan
+    'sketches_pais' y 'sketches_ano', y las reagrupaciones (país -> región, año -> década) combinan sketches.
+    """
+    claves = ['geocode', col_pais]
+    base = df_enriquecido.dropna(subset=claves)
+    anos = pd.Series(dtype=float)
+    if col_fecha in base.columns:
+        base = base.assign(Año=pd.to_datetime(base[col_fecha], errors='coerce').dt.year)
+        anos = base['Año'].dropna()
+    cubo = {'col_pais': col_pais, 'col_colaborador': col_colaborador, 'aproximado': aproximado}
+    if aproximado:
+        cubo['sketches_pais'] = construir_sketches(base, claves, col_colaborador)
+        region_base = base[claves + ['Region_Base']].drop_duplicates(claves)
+        cubo['paises'] = _resumir_aproximado(base, claves, col_colaborador, cubo['sketches_pais']).merge(region_base, on=claves)
+        cubo['categorias'] = {
+            columna: _resumir_aproximado(base, [columna] + claves, col_colaborador)
+            for columna in columnas_categoricas if columna in base.columns
+        }
+    else:
+        cubo['paises'] = base.groupby(claves + ['Region_Base'], dropna=False).agg(
+            Contribuciones=(col_colaborador, 'size'), Colaboradores=(col_colaborador, 'nunique')
+        ).reset_index()
+        cubo['pares'] = base[claves + [col_colaborador]].dropna().drop_duplicates().reset_index(drop=True)
+        cubo['categorias'] = {
+            columna: base.groupby([columna] + claves).agg(
+                Contribuciones=(col_colaborador, 'size'), Colaboradores=(col_colaborador, 'nunique')
+            ).reset_index()
+            for columna in columnas_categoricas if columna in base.columns
+        }
+    # Sin columna de fecha (o sin fechas válidas) las tablas anuales quedan vacías
+    base_anual = pd.DataFrame({'Año': pd.Series(dtype=int), col_colaborador: pd.Series(dtype=object)})
+    cubo['temporal'] = pd.DataFrame(columns=['Año'] + claves + ['Contribuciones'])
+    if not anos.empty:
+        base_anual = base.loc[anos.index].astype({'Año': int})
+        cubo['temporal'] = base_anual[['Año'] + claves].groupby(['Año'] + claves).size().reset_index(name='Contribuciones')
+    if aproximado:
+        cubo['sketches_ano'] = construir_sketches(base_anual, ['Año'], col_colaborador)
+    else:
+        cubo['colaboradores_ano'] = base_anual[['Año', col_colaborador]].dropna().drop_duplicates().reset_index(drop=True)
+    return cubo
+
+def _columna_metrica(agregacion):
+    """Columna del cubo correspondiente a la agregación 'size' (contribuciones) o 'nunique' (colaboradores)."""
+    return 'Contribuciones' if agregacion == 'size' else 'Colaboradores'
+
+def consultar_cubo_por_pais(cubo, agregacion='size'):
+    """Métrica por país (geocode, país, 'Valor') a partir del cubo."""
+    col_pais = cubo['col_pais']
+    return (
+        cubo['paises'].groupby(['geocode', col_pais], as_index=False)[_columna_metrica(agregacion)].sum()
+        .rename(columns={_columna_metrica(agregacion): 'Valor'})
+    )
+
+def consultar_cubo_por_region(cubo, agregacion='size', pais_central=None, paises_a_aislar=None, grupos_personalizados=None):
+    """
+    Reagrupa los países del cubo en regiones (ver aplicar_clasificacion_dinamica) y devuelve
+    (stats_por_region con 'Region' y 'Valor_Region', stats_por_pais con geocode, país, 'Region', 'Valor_Pais'
+    y 'Valor_Region'). Los colaboradores únicos por región se cuentan exactamente sobre los pares del cubo,
+    o, en un cubo aproximado, combinando los sketches de sus países.
+    """
+    col_pais, col_colaborador = cubo['col_pais'], cubo['col_colaborador']
+    paises = aplicar_clasificacion_dinamica(cubo['paises'], col_pais, pais_central, paises_a_aislar, grupos_personalizados)
+    columna = _columna_metrica(agregacion)
+    stats_por_pais = paises.groupby(['geocode', col_pais, 'Region'], as_index=False)[columna].sum().rename(columns={columna: 'Valor_Pais'})
+    if agregacion == 'size':
+        stats_por_region = stats_por_pais.groupby('Region', as_index=False)['Valor_Pais'].sum().rename(columns={'Valor_Pais': 'Valor_Region'})
+    elif cubo.get('aproximado'):
+        region_por_pais = paises[['geocode', col_pais, 'Region']].drop_duplicates(['geocode', col_pais])
+        regiones = cubo['sketches_pais']['grupos'].merge(region_por_pais, on=['geocode', col_pais], how='left')['Region']
+        sketches_region = combinar_sketches(cubo['sketches_pais'], regiones)
+        stats_por_region = sketches_region['grupos'].assign(Valor_Region=estimar_distintos(sketches_region).astype(int))
+    else:
+        region_por_pais = paises[['geocode', col_pais, 'Region']].drop_duplicates(['geocode', col_pais])
+        stats_por_region = (
+            cubo['pares'].merge(region_por_pais, on=['geocode', col_pais])
+            .groupby('Region', as_index=False)[col_colaborador].nunique()
+            .rename(columns={col_colaborador: 'Valor_Region'})
+        )
+    return stats_por_region, pd.merge(stats_por_pais, stats_por_region, on='Region', how='left')
+
+@st.cache_data
+def precalcular_distribuciones_variable(tabla_categoria, columna, col_pais='PaisOrigen', agregacion='size'):
+    """
+    Reparte en una sola pasada la tabla del cubo de una variable categórica (ver construir_cubo_geo)
+    en un diccionario {valor: distribución por país (geocode, país, 'Valor')}. Se cachea por estado de
+    filtros y variable, de modo que cambiar el valor seleccionado es una simple búsqueda.
+    """
+    metrica = _columna_metrica(agregacion)
+    tabla = tabla_categoria[[columna, 'geocode', col_pais, metrica]].rename(columns={metrica: 'Valor'})
+    tabla = tabla[tabla['Valor'] > 0].sort_values(by='Valor', ascending=False)
+    return {
+        valor: grupo.drop(columns=columna).reset_index(drop=True)
+        for valor, grupo in tabla.groupby(columna, sort=False)
+    }
+
+def seleccionar_valores_principales(distribuciones, n=4):
+    """Los n valores con más registros en total, para los mapas comparativos."""
+    totales = pd.Series({valor: df['Valor'].sum() for valor, df in distribuciones.items()}, dtype=float)
+    return totales.sort_values(ascending=False).head(n).index.tolist()
+
+@st.cache_data
+def calcular_matriz_temporal_paises(tabla_temporal, col_pais='PaisOrigen', periodo='Año', acumulado=False):
+    """
+    Matriz (periodo x geocode) de contribuciones a partir de la tabla 'temporal' del cubo, con una fila
+    por cada año o década del intervalo (los periodos sin datos quedan a cero). Con 'acumulado' cada
+    fila suma todos los periodos anteriores. Devuelve (matriz, nombres): 'nombres' asigna a cada geocode
+    su nombre de país más frecuente, para las etiquetas del mapa.
+    """
+    if tabla_temporal.empty:
+        return pd.DataFrame(), pd.Series(dtype=object)
+    paso = 10 if periodo == 'Década' else 1
+    periodos = tabla_temporal['Año'] // paso * paso
+    matriz = tabla_temporal.assign(Periodo=periodos).pivot_table(
+        index='Periodo', columns='geocode', values='Contribuciones', aggfunc='sum', fill_value=0
+    )
+    matriz = matriz.reindex(range(matriz.index.min(), matriz.index.max() + 1, paso), fill_value=0)
+    matriz.index.name = periodo
+    if acumulado:
+        matriz = matriz.cumsum()
+    nombres = (
+        tabla_temporal.groupby(['geocode', col_pais])['Contribuciones'].sum().reset_index()
+        .sort_values('Contribuciones', ascending=False).drop_duplicates('geocode')
+        .set_index('geocode')[col_pais].reindex(matriz.columns)
+    )
+    return matriz, nombres
+
+@st.cache_data
+def calcular_flujos_origen_revista(tabla_revistas, pais_por_revista, col_revista='Revista', peso_minimo=1, max_flujos=50):
+    """
+    Agrega las contribuciones en flujos (país de origen del colaborador -> país de la revista) a partir
+    de la tabla del cubo por revista (ver construir_cubo_geo) y de 'pais_por_revista' {revista: código ISO}.
+    Las revistas sin país asignado (ausentes o con valor nulo) no generan flujos.
+    Devuelve un diccionario con:
+      - 'flujos': los 'max_flujos' flujos entre países distintos de mayor peso (>= 'peso_minimo'):
+        'Origen', 'Destino', 'Peso'.
+      - 'internos': contribuciones de colaboradores del mismo país que la revista ('Destino', 'Peso').
+      - 'resto': flujos no dibujados agregados por destino ('Destino', 'Peso', 'Origenes').
+    """
+    vacio = {
+        'flujos': pd.DataFrame(columns=['Origen', 'Destino', 'Peso']),
+        'internos': pd.DataFrame(columns=['Destino', 'Peso']),
+        'resto': pd.DataFrame(columns=['Destino', 'Peso', 'Origenes']),
+    }
+    if tabla_revistas.empty:
+        return vacio
+    destino = tabla_revistas[col_revista].map(pais_por_revista)
+    flujos = (
+        tabla_revistas.assign(Origen=tabla_revistas['geocode'], Destino=destino).dropna(subset=['Destino'])
+        .groupby(['Origen', 'Destino'], as_index=False)['Contribuciones'].sum()
+        .rename(columns={'Contribuciones': 'Peso'})
+    )
+    internos = flujos['Origen'] == flujos['Destino']
+    externos = flujos[~internos & (flujos['Peso'] >= peso_minimo)].sort_values('Peso', ascending=False)
+    resto = externos.iloc[max_flujos:]
+    return {
+        'flujos': externos.iloc[:max_flujos].reset_index(drop=True),
+        'internos': flujos.loc[internos, ['Destino', 'Peso']].reset_index(drop=True),
+        'resto': resto.groupby('Destino', as_index=False).agg(Peso=('Peso', 'sum'), Origenes=('Origen', 'nunique')),
+    }
+
+def consultar_colaboradores_por_periodo(cubo, periodo='Año'):
+    """
+    Colaboradores únicos por año o década ('Periodo', 'Colaboradores'). En un cubo aproximado las
+    décadas se obtienen combinando los sketches anuales.
+    """
+    paso = 10 if periodo == 'Década' else 1
+    if cubo['temporal'].empty:
+        return pd.DataFrame({'Periodo': pd.Series(dtype=int), 'Colaboradores': pd.Series(dtype=int)})
+    if cubo.get('aproximado'):
+        sketches = cubo['sketches_ano']
+        if paso > 1:
+            sketches = combinar_sketches(sketches, (sketches['grupos']['Año'] // paso * paso).rename('Año'))
+        resultado = sketches['grupos'].assign(Colaboradores=estimar_distintos(sketches).astype(int))
+    else:
+        pares = cubo['colaboradores_ano']
+        resultado = pares.assign(Año=pares['Año'] // paso * paso).groupby('Año', as_index=False)[cubo['col_colaborador']].nunique()
+        resultado = resultado.rename(columns={cubo['col_colaborador']: 'Colaboradores'})
+    return resultado.rename(columns={'Año': 'Periodo'}).sort_values('Periodo').reset_index(drop=True)
@@ -1,11 +1,55 @@
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
 
 
-def crear_mapa_coropletico(df_mapa, col_geocodigo, col_color, col_pais_hover, titulo, locationmode='ISO-3', usar_escala_log=False, hover_data_config=None, labels=None):
+def _estilo_geo(fig, geometria=None):
+    """
+    Estilo común de los mapas. Con 'geometria' (ver components.geo.cargar_geometria_mundo) no se usa el
+    mapa base de Plotly, que se descarga de su CDN: cada subgráfico geo recibe primero una capa gris
+    con todos los países dibujada con la geometría local, y los fotogramas se desplazan en consecuencia.
+    """
+    if geometria is None:
+        fig.update_geos(
+            visible=False, resolution=50,
+            showcountries=True, countrycolor="DimGray",
+            showland=True, landcolor="lightgray",
+            showocean=True, oceancolor="azure"
+        )
+        return fig
+    fig.update_geos(visible=False, showframe=False, bgcolor="azure")
+    fig.update_traces(marker_line_color="DimGray", marker_line_width=0.5, selector=dict(type='choropleth'))
+    subgraficos = sorted({traza.geo or 'geo' for traza in fig.data})
+    fondos = [
+        go.Choropleth(
+            geojson=geometria['geojson'], featureidkey='id', locations=geometria['ids'], z=[0] * len(geometria['ids']),
+            colorscale=[[0, "lightgray"], [1, "lightgray"]], showscale=False, hoverinfo='skip',
+            marker_line_color="DimGray", marker_line_width=0.5, geo=subgrafico
+        )
+        for subgrafico in subgraficos
+    ]
+    fig.add_traces(fondos)
+    fig.data = fig.data[-len(fondos):] + fig.data[:-len(fondos)]
+    if fig.frames:
+        fig.frames = [
+            go.Frame(data=marco.data, name=marco.name, traces=[len(fondos) + i for i in (marco.traces or range(len(marco.data)))])
+            for marco in fig.frames
+        ]
+    return fig
+
+
+def _argumentos_geometria(geometria, locationmode='ISO-3'):
+    """Argumentos de ubicación de la traza: geometría local (por 'id' de la entidad) o modo de Plotly."""
+    if geometria is None:
+        return {'locationmode': locationmode}
+    return {'geojson': geometria['geojson'], 'featureidkey': 'id'}
+
+
+def crear_mapa_coropletico(df_mapa, col_geocodigo, col_color, col_pais_hover, titulo, locationmode='ISO-3', usar_escala_log=False, hover_data_config=None, labels=None, geometria=None):
     """
     Crea un mapa coroplético interactivo, robusto y completo, con soporte para labels personalizados.
+    Con 'geometria' se dibuja con la geometría local en lugar de la de Plotly (mapas sin conexión).
     """
     if df_mapa.empty or col_geocodigo not in df_mapa.columns:
         return None
@@ -24,21 +68,15 @@ def crear_mapa_coropletico(df_mapa, col_geocodigo, col_color, col_pais_hover, ti
     fig = px.choropleth(
         df_para_graficar,
         locations=col_geocodigo,
-        locationmode=locationmode,
         color=col_a_usar_para_color,
         hover_name=col_pais_hover,
         hover_data=hover_data_config,
         color_continuous_scale=px.colors.sequential.YlGnBu,
         title=titulo,
-        labels=labels if labels else {} # <-- Aplicamos los labels personalizados aquí
-    )
-    
-    fig.update_geos(
-        visible=False, resolution=50,
-        showcountries=True, countrycolor="DimGray",
-        showland=True, landcolor="lightgray",
-        showocean=True, oceancolor="azure"
+        labels=labels if labels else {}, # <-- Aplicamos los labels personalizados aquí
+        **_argumentos_geometria(geometria, locationmode)
     )
+    _estilo_geo(fig, geometria)
     
     fig.update_layout(
         margin={"r":0,"t":40,"l":0,"b":0},
@@ -46,6 +84,140 @@ def crear_mapa_coropletico(df_mapa, col_geocodigo, col_color, col_pais_hover, ti
     )
     return fig
 
+def crear_mapas_comparativos(distribuciones, valores, col_geocodigo, col_color, col_pais_hover, titulo, columnas=2, locationmode='ISO-3', usar_escala_log=False, geometria=None):
+    """
+    Dibuja varios mapas pequeños (uno por valor) lado a lado con una escala de color común,
+    a partir de las distribuciones ya calculadas {valor: DataFrame}.
+    """
+    partes = [distribuciones[v].assign(Faceta=str(v)) for v in valores if v in distribuciones and not distribuciones[v].empty]
+    if not partes:
+        return None
+    df_para_graficar = pd.concat(partes, ignore_index=True)
+    col_a_usar_para_color = col_color
+    barra_color_titulo = "Valor"
+    hover_data_config = {col_geocodigo: False, col_color: True}
+    if usar_escala_log:
+        col_a_usar_para_color = f"{col_color}_log"
+        df_para_graficar[col_a_usar_para_color] = np.log1p(df_para_graficar[col_color])
+        barra_color_titulo = "Valor (Escala Log)"
+        hover_data_config[col_a_usar_para_color] = False
+
+    fig = px.choropleth(
+        df_para_graficar,
+        locations=col_geocodigo,
+        color=col_a_usar_para_color,
+        hover_name=col_pais_hover,
+        hover_data=hover_data_config,
+        facet_col='Faceta',
+        facet_col_wrap=columnas,
+        category_orders={'Faceta': [str(v) for v in valores]},
+        color_continuous_scale=px.colors.sequential.YlGnBu,
+        title=titulo,
+        **_argumentos_geometria(geometria, locationmode)
+    )
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=', 1)[-1]))
+    _estilo_geo(fig, geometria)
+    filas = -(-len(partes) // columnas)
+    fig.update_layout(
+        height=320 * filas,
+        margin={"r":0,"t":60,"l":0,"b":0},
+        coloraxis_colorbar=dict(title=barra_color_titulo)
+    )
+    return fig
+
+def crear_mapa_animado(matriz, titulo, nombres_pais=None, locationmode='ISO-3', usar_escala_log=False, etiqueta_valor='Contribuciones', duracion_ms=600, geometria=None):
+    """
+    Crea un mapa coroplético animado a partir de una matriz (periodo x geocódigo). Todos los fotogramas
+    comparten la geometría y la escala de color: cada fotograma solo lleva los valores del periodo, y
+    la reproducción y el deslizador funcionan en el navegador sin volver a consultar los datos.
+    """
+    if matriz is None or matriz.empty:
+        return None
+    geocodigos = matriz.columns.tolist()
+    nombres = list(nombres_pais.reindex(geocodigos).fillna(pd.Series(geocodigos, index=geocodigos))) if nombres_pais is not None else geocodigos
+    valores = matriz.to_numpy(dtype=float)
+    colores = np.log1p(valores) if usar_escala_log else valores
+    zmax = float(colores.max()) if colores.size and colores.max() > 0 else 1.0
+    etiquetas = [str(p) for p in matriz.index]
+
+    def _traza(i):
+        return go.Choropleth(z=colores[i], customdata=valores[i])
+
+    fig = go.Figure(
+        data=[go.Choropleth(
+            locations=geocodigos, z=colores[0], customdata=valores[0], text=nombres,
+            zmin=0, zmax=zmax, colorscale=px.colors.sequential.YlGnBu, marker_line_color="DimGray",
+            colorbar=dict(title="Valor (Escala Log)" if usar_escala_log else "Valor"),
+            hovertemplate=f"<b>%{{text}}</b><br>{etiqueta_valor}: %{{customdata:,.0f}}<extra></extra>",
+            **_argumentos_geometria(geometria, locationmode)
+        )],
+        frames=[go.Frame(data=[_traza(i)], traces=[0], name=etiqueta) for i, etiqueta in enumerate(etiquetas)]
+    )
+    animacion = dict(frame=dict(duration=duracion_ms, redraw=True), transition=dict(duration=0), mode='immediate')
+    fig.update_layout(
+        title=titulo,
+        margin={"r":0,"t":40,"l":0,"b":0},
+        updatemenus=[dict(
+            type='buttons', direction='left', x=0.0, y=0.0, xanchor='left', yanchor='top', pad=dict(t=40, r=10),
+            buttons=[
+                dict(label='▶', method='animate', args=[None, dict(animacion, fromcurrent=True)]),
+                dict(label='❚❚', method='animate', args=[[None], dict(animacion, frame=dict(duration=0, redraw=False))]),
+            ]
+        )],
+        sliders=[dict(
+            x=0.1, y=0.0, len=0.9, pad=dict(t=30), currentvalue=dict(prefix=f"{matriz.index.name}: "),
+            steps=[dict(label=etiqueta, method='animate', args=[[etiqueta], dict(animacion, frame=dict(duration=0, redraw=True))]) for etiqueta in etiquetas]
+        )]
+    )
+    return _estilo_geo(fig, geometria)
+
+def crear_mapa_flujos(flujos, centroides, titulo, internos=None, nombres_pais=None, clases_grosor=5, geometria=None):
+    """
+    Dibuja los flujos (Origen -> Destino, Peso) como arcos de círculo máximo entre los centroides de
+    los países (Plotly traza las líneas de Scattergeo como geodésicas). Para que el mapa sea ligero,
+    las aristas se reparten en 'clases_grosor' trazas según su peso (una traza por grosor, con los
+    segmentos separados por None) en lugar de una traza por flujo. Los destinos se marcan con un
+    tamaño proporcional a sus contribuciones internas, si se indican.
+    """
+    if flujos is None or flujos.empty:
+        return None
+    nombres = (lambda codigo: nombres_pais.get(codigo, codigo)) if nombres_pais else (lambda codigo: codigo)
+    datos = flujos.join(centroides, on='Origen').join(centroides, on='Destino', rsuffix='_destino').dropna(subset=['lon', 'lat', 'lon_destino', 'lat_destino'])
+    if datos.empty:
+        return None
+    clases = pd.qcut(datos['Peso'].rank(method='first'), q=min(clases_grosor, len(datos)), labels=False)
+    peso_maximo = datos['Peso'].max()
+
+    fig = go.Figure()
+    for clase, grupo in datos.groupby(clases):
+        lon = np.column_stack([grupo['lon'], grupo['lon_destino'], np.full(len(grupo), np.nan)]).ravel()
+        lat = np.column_stack([grupo['lat'], grupo['lat_destino'], np.full(len(grupo), np.nan)]).ravel()
+        fig.add_trace(go.Scattergeo(
+            lon=lon, lat=lat, mode='lines', hoverinfo='skip', showlegend=False,
+            line=dict(width=1 + 7 * np.sqrt(grupo['Peso'].max() / peso_maximo), color="#e94f00"), opacity=0.6
+        ))
+    # Un punto por origen para el texto emergente de cada flujo
+    fig.add_trace(go.Scattergeo(
+        lon=datos['lon'], lat=datos['lat'], mode='markers', showlegend=False,
+        marker=dict(size=4 + 16 * np.sqrt(datos['Peso'] / peso_maximo), color="#e94f00", opacity=0.8),
+        text=[f"{nombres(o)} → {nombres(d)}: {p:,}" for o, d, p in zip(datos['Origen'], datos['Destino'], datos['Peso'])],
+        hovertemplate='%{text}<extra></extra>'
+    ))
+    destinos = pd.DataFrame({'Destino': datos['Destino'].unique()})
+    if internos is not None and not internos.empty:
+        destinos = destinos.merge(internos, on='Destino', how='outer')
+    destinos = destinos.join(centroides, on='Destino').dropna(subset=['lon', 'lat'])
+    internas = destinos['Peso'].fillna(0) if 'Peso' in destinos.columns else pd.Series(0, index=destinos.index)
+    fig.add_trace(go.Scattergeo(
+        lon=destinos['lon'], lat=destinos['lat'], mode='markers', showlegend=False,
+        marker=dict(size=10 + 20 * np.sqrt(internas / max(internas.max(), 1)), color="#00a0e9", line=dict(width=1, color="white")),
+        text=[f"{nombres(d)} (revistas)<br>Contribuciones internas: {int(p):,}" for d, p in zip(destinos['Destino'], internas)],
+        hovertemplate='%{text}<extra></extra>'
+    ))
+    fig.update_geos(projection_type='natural earth')
+    fig.update_layout(title=titulo, margin={"r":0,"t":40,"l":0,"b":0}, height=600)
+    return _estilo_geo(fig, geometria)
+
 # def crear_mapa_coropletico(df_mapa, col_geocodigo, col_color, col_pais_hover, titulo, locationmode='ISO-3', usar_escala_log=False, hover_data_config=None):
 #     """
 #     Crea un mapa coroplético interactivo, permitiendo una configuración de hover personalizada.
@@ -0,0 +1,45 @@
+# components/trabajador_comunidades.py
+# Particiones de comunidades que se ejecutan en los procesos del pool de analizar_estabilidad_comunidades
+# (components/data_processing_networks.py). El módulo no importa Streamlit: se precarga en el proceso
+# 'forkserver' (ver set_forkserver_preload), de modo que cada trabajador nace ya con networkx y numpy
+# importados.
+from multiprocessing import spawn
+import numpy as np
+import networkx as nx
+from networkx.algorithms import community
+
+# Los trabajadores que no se crean con 'fork' vuelven a ejecutar el script __main__ del padre al arrancar,
+# y Streamlit instala como __main__ la página en ejecución. Este módulo solo se precarga en el proceso
+# forkserver, cuyos hijos son trabajadores de este pool y no necesitan el __main__ del servidor; en los
+# demás procesos la función no se usa (solo se llama al preparar un proceso hijo).
+spawn._fixup_main_from_path = lambda main_path: None
+
+_GRAFOS = {}  # huella -> grafo: el último grafo reconstruido por este proceso
+
+
+def construir_grafo(num_nodos, aristas):
+    """Grafo no dirigido con nodos 0..num_nodos-1 y las 'aristas' (array n x 2 de ids)."""
+    G = nx.Graph()
+    G.add_nodes_from(range(num_nodos))
+    G.add_edges_from(aristas)
+    return G
+
+
+def particionar(G, metodo, semilla, resolucion):
+    """Ejecuta una partición y devuelve etiquetas alineadas con los ids de nodo."""
+    if metodo == 'Louvain':
+        comunidades = community.louvain_communities(G, resolution=resolucion, seed=semilla)
+    else:
+        comunidades = list(community.asyn_lpa_communities(G, seed=semilla))
+    etiquetas = np.empty(G.number_of_nodes(), dtype=np.int64)
+    for i, com in enumerate(comunidades):
+        etiquetas[list(com)] = i
+    return metodo, semilla, resolucion, community.modularity(G, comunidades, resolution=resolucion), len(comunidades), etiquetas
+
+
+def ejecutar_particion(huella, num_nodos, aristas, metodo, semilla, resolucion):
+    """Tarea del pool: reconstruye el grafo una sola vez por huella y proceso, y lo particiona."""
+    if huella not in _GRAFOS:
+        _GRAFOS.clear()
+        _GRAFOS[huella] = construir_grafo(num_nodos, aristas)
+    return particionar(_GRAFOS[huella], metodo, semilla, resolucion)
@@ -1,82 +1,107 @@
-from pyvis.network import Network
-import networkx as nx
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
 import streamlit.components.v1 as components
-import random
 
-def visualizar_red_pyvis(G, df_metricas_nodos, comunidades=None, physics_enabled=True):
+# Componente propio: su directorio (vis-network + un pequeño script) se sirve una sola vez
+# y el navegador lo cachea; en cada ejecución solo viaja el payload JSON del grafo.
+_componente_red = components.declare_component(
+    "red_vis", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "red_vis")
+)
+
+# Paleta fija para que una misma comunidad conserve su color entre ejecuciones
+PALETA_COMUNIDADES = [
+    "#e6194b", "#3cb44b", "#ffe119", "#4363d8", "#f58231", "#911eb4", "#46f0f0", "#f032e6",
+    "#bcf60c", "#fabebe", "#008080", "#e6beff", "#9a6324", "#fffac8", "#800000", "#aaffc3",
+    "#808000", "#ffd8b1", "#000075", "#a9a9a9"
+]
+COLORES_TIPO = {
+    'Revista': "#00a0e9", 'Colaborador': "#e94f00", 'Agregado': "#808080",
+    'Traductor': "#2ca02c", 'Autor traducido': "#e94f00", 'Traductor y autor': "#9467bd"
+}
+ESCALA_DISPOSICION = 1000  # Píxeles por unidad de las coordenadas normalizadas del servidor
+
+
+def _a_lista(valores, decimales=None):
+    """Convierte un array a lista JSON, redondeando y sustituyendo NaN por None."""
+    valores = np.asarray(valores, dtype=float)
+    if decimales is not None:
+        valores = np.round(valores, decimales)
+    return [None if np.isnan(v) else v for v in valores.tolist()]
+
+
+def preparar_datos_red(G, df_metricas_nodos, comunidades=None, physics_enabled=True):
     """
-    Crea una visualización interactiva de una red usando Pyvis.
-    Ahora puede colorear los nodos según las comunidades detectadas.
+    Construye el payload compacto que dibuja el componente 'red_vis'. Los nodos se identifican
+    por enteros y cada atributo va en un array con clave corta (l: etiquetas, t: tipo, s: tamaño,
+    g: centralidad, c: índice de color en la paleta 'p', e: aristas como pares consecutivos de
+    ids, ei: pares de idiomas de cada arista...). Las descripciones emergentes se componen en el
+    navegador a partir de estos arrays.
     """
-    if G.number_of_nodes() == 0:
-        return "<p>El grafo no tiene nodos para visualizar.</p>"
+    ids = df_metricas_nodos['Nodo'].astype(str).reset_index(drop=True)
+    n = len(ids)
+    columnas = df_metricas_nodos.reset_index(drop=True)
+    tipos = columnas['Tipo'].fillna('Indefinido') if 'Tipo' in columnas.columns else pd.Series('Indefinido', index=ids.index)
+    centralidad = columnas['Grado_Centralidad'].fillna(0).to_numpy(dtype=float) if 'Grado_Centralidad' in columnas.columns else np.zeros(n)
+    codigos_tipo, nombres_tipo = pd.factorize(tipos)
 
-    net = Network(height="800px", width="100%", bgcolor="#222222", font_color="white", notebook=True, cdn_resources='in_line')
-    
-    # Generar colores para las comunidades si se proporcionan
-    colores_comunidad = {}
+    # Color por comunidad si existe, si no, por tipo de nodo
+    paleta = list(COLORES_TIPO.values()) + PALETA_COMUNIDADES
+    indice_tipo = {tipo: i for i, tipo in enumerate(COLORES_TIPO)}
+    indices_color = tipos.map(indice_tipo).fillna(indice_tipo['Colaborador']).astype(int).to_numpy(copy=True)
+    id_comunidad = None
     if comunidades:
-        num_comunidades = len(set(comunidades.values()))
-        # Generar una lista de colores aleatorios y vistosos
-        lista_colores = [f'#{random.randint(0, 0xFFFFFF):06x}' for _ in range(num_comunidades)]
-        for i in range(num_comunidades):
-            colores_comunidad[i] = lista_colores[i]
+        id_comunidad = ids.map(comunidades).fillna(-1).astype(int).to_numpy()
+        con_comunidad = id_comunidad >= 0
+        indices_color[con_comunidad] = len(COLORES_TIPO) + id_comunidad[con_comunidad] % len(PALETA_COMUNIDADES)
 
-    for index, row in df_metricas_nodos.iterrows():
-        node_id = str(row['Nodo'])
-        
-        # --- LÓGICA CORREGIDA PARA EL TÍTULO Y COLOR ---
-        tipo_nodo = row.get('Tipo', 'Indefinido') # Usar .get() para un acceso seguro
-        
-        title = f"<b>{node_id}</b><br>Tipo: {tipo_nodo}"
-        # Añadir otras métricas al título del hover
-        if 'Grado_Centralidad' in row:
-            title += f"<br>Centralidad: {row['Grado_Centralidad']:.3f}"
-        if 'Intermediacion' in row and row['Intermediacion'] > 0:
-            title += f"<br>Intermediación: {row['Intermediacion']:.3f}"
-        
-        value = row.get('Grado_Centralidad', 0) * 150
-        
-        # Asignar color por comunidad o, si no, por tipo de nodo
-        if comunidades and node_id in comunidades:
-            id_comunidad = comunidades[node_id]
-            # ... (código de color de comunidad sin cambios) ...
-            title += f"<br>Comunidad: {id_comunidad}"
-        else:
-            # Color por defecto basado en el tipo de nodo
-            color = "#00a0e9" if tipo_nodo == 'Revista' else "#e94f00" 
-        # --- FIN DE LA CORRECCIÓN ---
-        
-    # for index, row in df_metricas_nodos.iterrows():
-    #     node_id = str(row['Nodo'])
-    #     title = f"<b>{node_id}</b><br>Tipo: {row['Tipo']}"
-    #     value = row['Grado_Centralidad'] * 150
-        
-    #     # Asignar color: por comunidad si existe, si no, por tipo de nodo
-    #     if comunidades and node_id in comunidades:
-    #         id_comunidad = comunidades[node_id]
-    #         color = colores_comunidad.get(id_comunidad, "#808080") # Gris si hay algún error
-    #         title += f"<br>Comunidad: {id_comunidad}"
-    #     else: # Comportamiento original si no hay análisis de comunidad
-    #         color = "#00a0e9" if row['Tipo'] == 'Revista' else "#e94f00"
-            
-        net.add_node(node_id, label=node_id, title=title, value=value, color=color)
+    posicion = pd.Series(np.arange(n), index=ids)
+    aristas = pd.DataFrame(
+        [(str(u), str(v), d.get('weight'), d.get('idiomas')) for u, v, d in G.edges(data=True)], columns=['u', 'v', 'w', 'ei']
+    )
+    aristas['u'], aristas['v'] = aristas['u'].map(posicion), aristas['v'].map(posicion)
+    aristas = aristas.dropna(subset=['u', 'v'])
 
-    for edge in G.edges():
-        net.add_edge(str(edge[0]), str(edge[1]))
+    datos = {
+        'l': ids.tolist(),
+        't': codigos_tipo.tolist(),
+        'tn': [str(t) for t in nombres_tipo],
+        's': _a_lista(centralidad * 150, 3),
+        'g': _a_lista(centralidad, 4),
+        'c': indices_color.tolist(),
+        'p': paleta,
+        'e': aristas[['u', 'v']].to_numpy(dtype=np.int64).ravel().tolist(),
+        'w': _a_lista(aristas['w'], 3) if aristas['w'].notna().any() else None,
+        'ei': aristas['ei'].where(aristas['ei'].notna(), None).tolist() if aristas['ei'].notna().any() else None,
+        'd': int(G.is_directed()),
+        'b': _a_lista(columnas['Intermediacion'].fillna(0), 4) if 'Intermediacion' in columnas.columns else None,
+        'n': columnas['Miembros'].fillna(0).astype(int).tolist() if 'Miembros' in columnas.columns else None,
+        'k': id_comunidad.tolist() if id_comunidad is not None else None,
+        'x': None, 'y': None,
+        'f': int(physics_enabled),
+    }
 
-    net.show_buttons(filter_=['physics'])
-    
-    # --- Lógica de Física Optimizada ---
-    if physics_enabled:
-        # Muestra los botones para que el usuario pueda jugar con la física
-        net.show_buttons(filter_=['physics'])
-    else:
-        # Desactiva la física para una carga instantánea
-        net.toggle_physics(False)
+    # Posiciones fijas precalculadas en el servidor (ver calcular_disposicion_red)
+    if {'x', 'y'}.issubset(columnas.columns):
+        escala = ESCALA_DISPOSICION * max(1.0, np.sqrt(n) / 10)
+        datos['x'] = _a_lista(columnas['x'].to_numpy(dtype=float) * escala, 1)
+        datos['y'] = _a_lista(columnas['y'].to_numpy(dtype=float) * escala, 1)
 
-    try:
-        html_source = net.generate_html()
-        return html_source
-    except Exception as e:
-        return f"<p>Error al generar el grafo HTML: {e}</p>"
\ No newline at end of file
+    datos['h'] = hashlib.sha1(json.dumps(datos, separators=(',', ':')).encode('utf-8')).hexdigest()
+    return datos
+
+
+def visualizar_red(G, df_metricas_nodos, comunidades=None, physics_enabled=True, altura=800, key=None):
+    """
+    Dibuja una red interactiva con vis-network. Puede colorear los nodos según las comunidades
+    detectadas. Para redes grandes, reducirla antes con 'reducir_red_nivel_detalle'. Si el DataFrame
+    trae columnas 'x' e 'y', los nodos se dibujan en esas posiciones y, salvo que se active la física,
+    el navegador no ejecuta ninguna simulación.
+    """
+    if G.number_of_nodes() == 0:
+        st.info("El grafo no tiene nodos para visualizar.")
+        return
+    _componente_red(datos=preparar_datos_red(G, df_metricas_nodos, comunidades, physics_enabled), altura=altura, key=key, default=None)
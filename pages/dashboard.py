@@ -2,6 +2,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from components.corpus import proyectar_corpus
 from components.data_processing import *
 from components.visualization import crear_grafico_conexiones, crear_grafico_frecuencia, crear_grafico_evolucion
 
@@ -23,7 +24,7 @@ if df_listo is None or not selected_cols:
     st.stop() # Detiene la ejecución de esta página si los datos base no están listos
 
 # DataFrame base para este dashboard
-df_dashboard_base = df_listo[selected_cols].copy()
+df_dashboard_base = proyectar_corpus(df_listo, selected_cols)
 
 st.sidebar.header("Filtros del Dashboard")
 
@@ -123,7 +124,7 @@ if bio_data_disponible and lista_sexo: # Mostrar solo si hay datos bio y la colu
     )
 
 # --- Aplicar Filtros al DataFrame ---
-df_filtrado = df_dashboard_base.copy() # Empezar con una copia del df base
+df_filtrado = df_dashboard_base # Los filtros devuelven nuevos DataFrames (copy-on-write)
 
 if selected_revistas and 'Revista' in df_filtrado.columns:
     df_filtrado = df_filtrado[df_filtrado['Revista'].isin(selected_revistas)]
@@ -174,7 +175,7 @@ else:
             key="cb_anonimos_tipologia"
         )
 
-        df_para_grafico_tipologia = df_filtrado.copy() # Trabajar con una copia para no alterar df_filtrado globalmente
+        df_para_grafico_tipologia = df_filtrado # Con copy-on-write los cambios no alteran df_filtrado
         num_anonimos_descartados_tipologia = 0
 
         if descartar_anonimos_tipologia:
@@ -546,6 +547,30 @@ else:
 
     # --- FIN PASO 5 y 6 ---
 
+# --- PASO 7: COLABORADORES CON PERFIL SIMILAR ---
+    st.markdown("---")
+    st.subheader("7. Colaboradores con perfil de publicación similar")
+    st.markdown("Compara revistas, tipologías y años de actividad de cada colaborador (similitud del coseno) sobre todo el conjunto de datos.")
+
+    if 'Colaborador' in df_dashboard_base.columns and lista_colaboradores:
+        # El índice se construye sobre el corpus completo (sin los filtros de la barra lateral ni la
+        # eliminación de fechas inválidas), así que solo se reconstruye si cambian los datos cargados
+        indice_similitud = obtener_indice_similitud_colaboradores(proyectar_corpus(df_listo, selected_cols), col_fecha=columna_fecha)
+        col_sel_similar, col_k_similar = st.columns([3, 1])
+        colaboradores_consulta = col_sel_similar.multiselect(
+            "Colaborador(es) a consultar:", options=lista_colaboradores,
+            default=selected_colaboradores[:3], key="multiselect_colaboradores_similares"
+        )
+        k_similares = col_k_similar.number_input("Resultados por colaborador:", min_value=1, max_value=50, value=10, step=1, key="num_k_colaboradores_similares")
+        if colaboradores_consulta:
+            df_similares = buscar_colaboradores_similares(indice_similitud, colaboradores_consulta, k=int(k_similares))
+            st.caption(f"Perfil construido con: {', '.join(indice_similitud['bloques'])}.")
+            st.dataframe(df_similares, hide_index=True, use_container_width=True)
+        else:
+            st.info("Selecciona uno o más colaboradores para ver los perfiles más parecidos.")
+    else:
+        st.info("Para ver colaboradores similares, asegúrate de que la columna 'Colaborador' esté seleccionada en la página de Inicio.")
+
     
 st.markdown("---")
 st.header("Navegar a otras visualizaciones")
@@ -2,14 +2,23 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from components.corpus import proyectar_corpus
 
 # Importar las funciones desde los nuevos módulos
 from components.maps import (
     enriquecer_con_geo_info, 
-    aplicar_clasificacion_dinamica,
-    calcular_distribucion_geo_variable
+    construir_cubo_geo,
+    consultar_cubo_por_pais,
+    consultar_cubo_por_region,
+    precalcular_distribuciones_variable,
+    seleccionar_valores_principales,
+    calcular_matriz_temporal_paises,
+    calcular_flujos_origen_revista,
+    consultar_colaboradores_por_periodo
 )
-from components.maps_viz import crear_mapa_coropletico
+from components.conteo_aproximado import error_relativo_hll
+from components.maps_viz import crear_mapa_coropletico, crear_mapas_comparativos, crear_mapa_animado, crear_mapa_flujos
+from components.geo import cargar_referencia_geografica, cargar_geometria_mundo, NIVELES_SIMPLIFICACION
 
 st.set_page_config(page_title="Hemerograph - Visualizaciones Geoespaciales", layout="wide")
 st.title("🗺️ Visualizaciones geoespaciales y regionales")
@@ -22,37 +31,59 @@ if df_listo is None or not selected_cols:
     st.warning("Primero debes cargar y configurar los datos en la página de '🏠 Inicio'.")
     st.stop()
 
-df_dashboard_base = df_listo[selected_cols].copy()
+df_dashboard_base = proyectar_corpus(df_listo, selected_cols)
 COLUMNA_PAIS_ORIGINAL = 'PaisOrigen'
 COLUMNA_REVISTA = 'Revista'
 COLUMNA_COLABORADOR = 'Colaborador'
+COLUMNA_FECHA = 'Fecha Publicación'
 
-# Carga de Archivos de Mapeo
+# Carga de Archivos de Mapeo (una sola lectura por proceso, compartida entre sesiones)
 try:
-    df_world = pd.read_csv('data/world.csv', encoding='utf-8')
-    if 'ISO_A3_EH' not in df_world.columns or 'REGION_WB' not in df_world.columns or 'NAME_ES' not in df_world.columns:
-        st.error("El archivo 'world.csv' debe contener 'ISO_A3_EH', 'REGION_WB' y 'NAME_ES'.")
-        st.stop()
+    referencia_geo = cargar_referencia_geografica()
+    df_world = referencia_geo['tabla']
 except FileNotFoundError:
     st.error("Archivo 'data/world.csv' no encontrado. Es necesario para la clasificación.")
     st.stop()
+except ValueError:
+    st.error("El archivo 'world.csv' debe contener 'ISO_A3_EH', 'REGION_WB' y 'NAME_ES'.")
+    st.stop()
 
 # --- Filtro Global y Estandarización (Se hace una vez para toda la página) ---
 st.sidebar.header("Filtros globales para mapas")
-df_filtrado_mapas = df_dashboard_base.copy()
+df_filtrado_mapas = df_dashboard_base
 if COLUMNA_REVISTA in df_dashboard_base.columns:
     lista_revistas_global = sorted(df_dashboard_base[COLUMNA_REVISTA].dropna().unique())
     revistas_seleccionadas_global = st.sidebar.multiselect("Filtrar todos los mapas por revista(s):", lista_revistas_global)
     if revistas_seleccionadas_global:
         df_filtrado_mapas = df_dashboard_base[df_dashboard_base[COLUMNA_REVISTA].isin(revistas_seleccionadas_global)]
 
+# Conteo aproximado: para corpus muy grandes, los colaboradores únicos se estiman con sketches HyperLogLog
+conteo_aproximado = st.sidebar.checkbox("Conteo aproximado de colaboradores únicos", value=False, key="check_conteo_aproximado", help="Recomendado solo para corpus muy grandes (millones de filas).")
+if conteo_aproximado:
+    st.sidebar.caption(f"Colaboradores únicos estimados (HyperLogLog): error típico ±{error_relativo_hll():.1%}, ±{2 * error_relativo_hll():.1%} con un 95 % de confianza.")
+
+# Geometría local: los mapas se dibujan sin descargar nada de la CDN de Plotly (redes aisladas)
+geometria_mapas = None
+if st.sidebar.checkbox("Usar geometría local (sin conexión)", value=False, key="check_geometria_local"):
+    nivel_geometria = st.sidebar.select_slider("Nivel de detalle de las fronteras:", options=list(NIVELES_SIMPLIFICACION), value='Media', key="slider_nivel_geometria")
+    try:
+        geometria_mapas = cargar_geometria_mundo(nivel_geometria)
+    except FileNotFoundError:
+        st.sidebar.warning("No se encontró 'data/world.csv' con la geometría de los países; se usa la de Plotly.")
+
 # Creación del DataFrame base estandarizado para usar en todas las pestañas
 df_enriquecido = pd.DataFrame()
 if COLUMNA_PAIS_ORIGINAL in df_filtrado_mapas.columns:
     df_enriquecido = enriquecer_con_geo_info(
         df_datos=df_filtrado_mapas, df_world=df_world,
-        col_pais_datos=COLUMNA_PAIS_ORIGINAL, col_pais_world='NAME_ES', col_iso_world='ISO_A3_EH', col_region_world='REGION_WB'
+        col_pais_datos=COLUMNA_PAIS_ORIGINAL, col_pais_world='NAME_ES', col_iso_world='ISO_A3_EH', col_region_world='REGION_WB',
+        indice_alias=referencia_geo['indice_alias']
     )
+    df_paises_no_encontrados = pd.DataFrame(list(df_enriquecido.attrs.get('paises_no_encontrados', {}).items()), columns=['Pais', 'Filas'])
+    if not df_paises_no_encontrados.empty:
+        with st.sidebar.expander(f"⚠️ {len(df_paises_no_encontrados)} país(es) sin correspondencia ({df_paises_no_encontrados['Filas'].sum():,} filas)"):
+            st.caption("Estas filas no aparecen en los mapas. Puedes añadir sus nombres a 'data/alias_paises.csv'.")
+            st.dataframe(df_paises_no_encontrados, hide_index=True)
 else:
     st.error(f"La columna '{COLUMNA_PAIS_ORIGINAL}' no se encuentra en los datos. No se pueden generar mapas.")
     st.stop()
@@ -63,7 +94,11 @@ else:
 if df_enriquecido.empty:
     st.warning("No hay datos geográficos para mostrar con los filtros aplicados.")
 else:
-    tab1, tab2, tab3 = st.tabs(["Estadísticas Generales", "Análisis Regional Dinámico", "Playground Geo-Temático"])
+    # Cubo por país calculado una vez por estado de filtros; las tres pestañas lo consultan
+    columnas_cubo = [col for col in ['geocode', COLUMNA_PAIS_ORIGINAL, 'Region_Base', COLUMNA_COLABORADOR, 'Tipología', 'Sexo', COLUMNA_REVISTA, COLUMNA_FECHA] if col in df_enriquecido.columns]
+    cubo_geo = construir_cubo_geo(df_enriquecido[columnas_cubo], COLUMNA_PAIS_ORIGINAL, COLUMNA_COLABORADOR, col_fecha=COLUMNA_FECHA, aproximado=conteo_aproximado)
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Estadísticas Generales", "Análisis Regional Dinámico", "Playground Geo-Temático", "Evolución Temporal", "Flujos Origen → Revista"])
 
     # --- PESTAÑA 1: MAPA DE ESTADÍSTICAS GENERALES ---
     with tab1:
@@ -74,19 +109,20 @@ else:
         with col_b: usar_log_t1 = st.checkbox("Usar escala logarítmica", value=True, key="check_log_mapa1")
         
         agg_func_t1 = 'nunique' if metrica_seleccionada_t1 == 'Colaboradores Únicos' else 'size'
-        df_metricas_t1 = df_enriquecido.groupby(['geocode', COLUMNA_PAIS_ORIGINAL]).agg(Valor=(COLUMNA_COLABORADOR, agg_func_t1)).reset_index()
+        df_metricas_t1 = consultar_cubo_por_pais(cubo_geo, agg_func_t1)
         
         fig_mapa1 = crear_mapa_coropletico(
         df_mapa=df_metricas_t1, 
         col_geocodigo='geocode', 
         col_color='Valor', 
         col_pais_hover=COLUMNA_PAIS_ORIGINAL,
-        titulo=f"{metrica_seleccionada_t1} por país", 
+        titulo=f"{metrica_seleccionada_t1} por país{' (≈)' if conteo_aproximado and agg_func_t1 == 'nunique' else ''}", 
         usar_escala_log=usar_log_t1,
         # 1. Especificar qué mostrar/ocultar en el hover
         hover_data_config={'geocode': False, 'Valor': True},
         # 2. Renombrar la etiqueta 'Valor' por una más descriptiva
-        labels={'Valor': metrica_seleccionada_t1}
+        labels={'Valor': metrica_seleccionada_t1},
+        geometria=geometria_mapas
     )
         # fig_mapa1 = crear_mapa_coropletico(
         #     df_mapa=df_metricas_t1, col_geocodigo='geocode', col_color='Valor', col_pais_hover=COLUMNA_PAIS_ORIGINAL,
@@ -99,7 +135,7 @@ else:
         st.header("Análisis Regional Dinámico y Personalizado")
         st.write("Crea tus propias agrupaciones geográficas y visualiza sus métricas agregadas.")
         
-        lista_paises_disponibles = sorted(df_enriquecido[COLUMNA_PAIS_ORIGINAL].dropna().unique())
+        lista_paises_disponibles = sorted(cubo_geo['paises'][COLUMNA_PAIS_ORIGINAL].unique())
         st.markdown("##### 1. Define tus grupos de análisis")
         pais_central_seleccionado = st.selectbox("A. Selecciona un país central:", [None] + lista_paises_disponibles, format_func=lambda x: 'Ninguno' if x is None else x)
         paises_aislados_seleccionados = st.multiselect("B. Aísla otros países:", [p for p in lista_paises_disponibles if p != pais_central_seleccionado])
@@ -121,17 +157,14 @@ else:
         st.markdown("##### 2. Selecciona una métrica y visualiza")
         metrica_regional_seleccionada = st.radio("Métrica a visualizar:", ('Colaboraciones Totales', 'Colaboradores Únicos'), key="radio_mapa2", horizontal=True)
         
-        df_con_regiones = aplicar_clasificacion_dinamica(df_enriquecido, COLUMNA_PAIS_ORIGINAL, pais_central_seleccionado, paises_aislados_seleccionados, grupos_personalizados_finales)
         agg_func_t2 = 'size' if metrica_regional_seleccionada == 'Colaboraciones Totales' else 'nunique'
-        stats_por_region = df_con_regiones.groupby('Region').agg(Valor_Region=(COLUMNA_COLABORADOR, agg_func_t2)).reset_index()
-        stats_por_pais = df_con_regiones.groupby(['geocode', COLUMNA_PAIS_ORIGINAL, 'Region']).agg(Valor_Pais=(COLUMNA_COLABORADOR, agg_func_t2)).reset_index()
-        df_para_mapa2 = pd.merge(stats_por_pais, stats_por_region, on='Region', how='left')
+        stats_por_region, df_para_mapa2 = consultar_cubo_por_region(cubo_geo, agg_func_t2, pais_central_seleccionado, paises_aislados_seleccionados, grupos_personalizados_finales)
 
         col_mapa, col_stats = st.columns([3, 2])
         with col_mapa:
-            fig_mapa2 = crear_mapa_coropletico(df_para_mapa2, 'geocode', 'Valor_Region', 'PaisOrigen', f"{metrica_regional_seleccionada} por Región", hover_data_config={'Region': True, 'Valor_Pais': True}, usar_escala_log=True)
+            fig_mapa2 = crear_mapa_coropletico(df_para_mapa2, 'geocode', 'Valor_Region', 'PaisOrigen', f"{metrica_regional_seleccionada} por Región{' (≈)' if conteo_aproximado and agg_func_t2 == 'nunique' else ''}", hover_data_config={'Region': True, 'Valor_Pais': True}, usar_escala_log=True, geometria=geometria_mapas)
             if fig_mapa2:
-                fig_mapa2.update_traces(hovertemplate='<b>%{hovertext}</b><br><br>Región: %{customdata[0]}<br>Valor (País): %{customdata[1]}<extra></extra>', customdata=df_para_mapa2[['Region', 'Valor_Pais']])
+                fig_mapa2.update_traces(hovertemplate='<b>%{hovertext}</b><br><br>Región: %{customdata[0]}<br>Valor (País): %{customdata[1]}<extra></extra>', customdata=df_para_mapa2[['Region', 'Valor_Pais']], selector=dict(coloraxis='coloraxis'))
                 st.plotly_chart(fig_mapa2, use_container_width=True)
         with col_stats:
             fig_stats = px.bar(stats_por_region, x='Valor_Region', y='Region', orientation='h', title=f"Comparativa: {metrica_regional_seleccionada}", text_auto=True)
@@ -146,16 +179,84 @@ else:
         opciones_columnas = [col for col in ['Tipología', 'Sexo', 'Revista'] if col in df_enriquecido.columns]
         if opciones_columnas:
             columna_a_analizar = st.selectbox("1. Selecciona la variable a explorar:", opciones_columnas)
-            lista_valores = sorted(df_enriquecido[columna_a_analizar].dropna().unique())
+            # Distribución de todos los valores de la variable en una sola pasada (cacheada)
+            distribuciones_playground = precalcular_distribuciones_variable(cubo_geo['categorias'][columna_a_analizar], columna_a_analizar, COLUMNA_PAIS_ORIGINAL)
+            lista_valores = sorted(distribuciones_playground)
             valor_a_mapear = st.selectbox(f"2. Selecciona el valor de '{columna_a_analizar}':", lista_valores)
             
-            if st.button("Generar Mapa del Playground"):
-                df_playground = calcular_distribucion_geo_variable(df_enriquecido, columna_a_analizar, valor_a_mapear, COLUMNA_PAIS_ORIGINAL, 'geocode')
-                if not df_playground.empty:
-                    fig_playground = crear_mapa_coropletico(df_playground, 'geocode', 'Valor', COLUMNA_PAIS_ORIGINAL, f"Distribución de '{valor_a_mapear}' ({columna_a_analizar})", usar_escala_log=True)
-                    if fig_playground: st.plotly_chart(fig_playground, use_container_width=True)
-                else:
-                    st.info(f"No se encontraron registros de '{valor_a_mapear}' para los filtros actuales.")
+            df_playground = distribuciones_playground.get(valor_a_mapear, pd.DataFrame())
+            if not df_playground.empty:
+                fig_playground = crear_mapa_coropletico(df_playground, 'geocode', 'Valor', COLUMNA_PAIS_ORIGINAL, f"Distribución de '{valor_a_mapear}' ({columna_a_analizar})", usar_escala_log=True, geometria=geometria_mapas)
+                if fig_playground: st.plotly_chart(fig_playground, use_container_width=True)
+            else:
+                st.info(f"No se encontraron registros de '{valor_a_mapear}' para los filtros actuales.")
+
+            with st.expander("Comparar los valores más frecuentes"):
+                num_valores_comparar = len(lista_valores)
+                if len(lista_valores) > 2:
+                    num_valores_comparar = st.slider("Número de valores:", 2, min(9, len(lista_valores)), min(4, len(lista_valores)), key="slider_comparar_playground")
+                if st.checkbox("Mostrar mapas comparativos", key="check_comparar_playground"):
+                    valores_principales = seleccionar_valores_principales(distribuciones_playground, num_valores_comparar)
+                    fig_comparativa = crear_mapas_comparativos(distribuciones_playground, valores_principales, 'geocode', 'Valor', COLUMNA_PAIS_ORIGINAL, f"'{columna_a_analizar}': {len(valores_principales)} valores más frecuentes", columnas=3 if num_valores_comparar > 4 else 2, usar_escala_log=True, geometria=geometria_mapas)
+                    if fig_comparativa: st.plotly_chart(fig_comparativa, use_container_width=True)
+
+    # --- PESTAÑA 4: MAPA ANIMADO DE EVOLUCIÓN TEMPORAL ---
+    with tab4:
+        st.header("Evolución temporal por país")
+        st.write("Recorre el periodo del corpus año a año o por décadas. Los fotogramas se calculan una sola vez y la animación se reproduce en el navegador.")
+        if cubo_geo['temporal'].empty:
+            st.info(f"Se necesita la columna '{COLUMNA_FECHA}' con fechas válidas para animar el mapa.")
+        else:
+            col_a, col_b, col_c = st.columns(3)
+            with col_a: periodo_animacion = st.radio("Periodo:", ('Año', 'Década'), key="radio_periodo_mapa4", horizontal=True)
+            with col_b: acumulado_animacion = st.checkbox("Acumulado", value=False, key="check_acumulado_mapa4")
+            with col_c: usar_log_t4 = st.checkbox("Usar escala logarítmica", value=True, key="check_log_mapa4")
+            matriz_temporal, nombres_paises_t4 = calcular_matriz_temporal_paises(cubo_geo['temporal'], COLUMNA_PAIS_ORIGINAL, periodo_animacion, acumulado_animacion)
+            titulo_t4 = f"Contribuciones {'acumuladas ' if acumulado_animacion else ''}por país ({periodo_animacion.lower()})"
+            fig_mapa4 = crear_mapa_animado(matriz_temporal, titulo_t4, nombres_paises_t4, usar_escala_log=usar_log_t4, geometria=geometria_mapas)
+            if fig_mapa4: st.plotly_chart(fig_mapa4, use_container_width=True)
+
+            df_colaboradores_periodo = consultar_colaboradores_por_periodo(cubo_geo, periodo_animacion)
+            fig_colaboradores_periodo = px.bar(df_colaboradores_periodo, x='Periodo', y='Colaboradores', title=f"Colaboradores únicos por {periodo_animacion.lower()}{' (≈)' if conteo_aproximado else ''}")
+            fig_colaboradores_periodo.update_layout(xaxis_title=periodo_animacion, yaxis_title="Colaboradores únicos")
+            st.plotly_chart(fig_colaboradores_periodo, use_container_width=True)
+
+    # --- PESTAÑA 5: MAPA DE FLUJOS (ORIGEN DEL COLABORADOR -> PAÍS DE LA REVISTA) ---
+    with tab5:
+        st.header("Flujos desde el país de origen hasta el país de la revista")
+        st.write("Cada línea une el país de origen de los colaboradores con el país donde se publica la revista; su grosor indica el número de contribuciones.")
+        if COLUMNA_REVISTA not in cubo_geo['categorias'] or referencia_geo['centroides'].empty:
+            st.info(f"Se necesita la columna '{COLUMNA_REVISTA}' y los centroides de 'world.csv' (LABEL_X, LABEL_Y) para este mapa.")
+        else:
+            tabla_revistas = cubo_geo['categorias'][COLUMNA_REVISTA]
+            nombres_world = sorted(nombre for nombre in referencia_geo['iso_por_nombre'] if isinstance(nombre, str))
+            with st.expander("País de publicación de cada revista"):
+                # Los datos no traen el país de publicación: sin valor por defecto, cada revista queda sin
+                # país (y fuera del mapa) hasta que se asigne aquí.
+                pais_por_defecto = st.selectbox("País por defecto:", nombres_world, index=None, placeholder="Sin país asignado", key="sel_pais_revistas")
+                df_paises_revistas = st.data_editor(
+                    pd.DataFrame({COLUMNA_REVISTA: sorted(tabla_revistas[COLUMNA_REVISTA].unique()), 'País': pais_por_defecto}),
+                    column_config={'País': st.column_config.SelectboxColumn('País', options=nombres_world, required=False)},
+                    disabled=[COLUMNA_REVISTA], hide_index=True, key="editor_paises_revistas"
+                )
+            col_a, col_b = st.columns(2)
+            with col_a: peso_minimo_flujos = st.number_input("Peso mínimo de un flujo:", min_value=1, value=2, step=1, key="num_peso_minimo_flujos")
+            with col_b: max_flujos = st.slider("Número máximo de flujos dibujados:", 5, 200, 50, step=5, key="slider_max_flujos")
+            pais_por_revista = dict(zip(df_paises_revistas[COLUMNA_REVISTA], df_paises_revistas['País'].map(referencia_geo['iso_por_nombre'])))
+            revistas_sin_pais = sum(pd.isna(iso) for iso in pais_por_revista.values())
+            if revistas_sin_pais:
+                st.caption(f"{revistas_sin_pais} de {len(pais_por_revista)} revistas no tienen país de publicación asignado y no se incluyen en los flujos.")
+            resultado_flujos = calcular_flujos_origen_revista(tabla_revistas, pais_por_revista, COLUMNA_REVISTA, peso_minimo_flujos, max_flujos)
+            nombres_por_iso = {iso: nombre for nombre, iso in referencia_geo['iso_por_nombre'].items()}
+            fig_mapa5 = crear_mapa_flujos(resultado_flujos['flujos'], referencia_geo['centroides'], "Flujos de contribuciones: origen → revista", resultado_flujos['internos'], nombres_por_iso, geometria=geometria_mapas)
+            if fig_mapa5:
+                st.plotly_chart(fig_mapa5, use_container_width=True)
+            else:
+                st.info("No hay flujos entre países distintos que superen el peso mínimo.")
+            df_resto = resultado_flujos['resto']
+            if not df_resto.empty:
+                st.caption(f"Otros {df_resto['Peso'].sum():,} contribuciones de {df_resto['Origenes'].sum()} flujos menores no se dibujan (agregadas por destino):")
+                st.dataframe(df_resto.assign(Destino=df_resto['Destino'].map(nombres_por_iso).fillna(df_resto['Destino'])), hide_index=True)
 
 
     
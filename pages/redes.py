@@ -1,16 +1,37 @@
+import io
 import streamlit as st
+import numpy as np
 import pandas as pd
 import networkx as nx
-import streamlit.components.v1 as components
+import plotly.express as px
+from components.corpus import proyectar_corpus
 
 # Importar nuestras funciones optimizadas
 from components.data_processing_networks import (
     crear_red_bimodal, 
+    crear_red_traducciones,
     calcular_metricas_red, 
     proyectar_red_unimodal, 
-    detectar_comunidades_louvain
+    proyectar_red_ponderada,
+    detectar_comunidades_louvain,
+    calcular_metricas_ventanas_temporales,
+    calcular_linea_tiempo_anual,
+    calcular_similitud_revistas,
+    ordenar_matriz_por_agrupamiento,
+    obtener_revistas_similares,
+    MEDIDAS_SIMILITUD,
+    calcular_huella_grafo,
+    analizar_estabilidad_comunidades,
+    reducir_red_nivel_detalle,
+    calcular_disposicion_red,
+    calcular_metricas_extendidas,
+    calcular_hits,
+    construir_indice_consultas,
+    consultar_red_ego,
+    consultar_camino_minimo
 )
-from components.visualization_networks import visualizar_red_pyvis
+from components.visualization_networks import visualizar_red
+from components.export_networks import FORMATOS_EXPORTACION, exportar_red
 
 st.set_page_config(page_title="Análisis de Redes", layout="wide")
 st.title("🕸️ Análisis de Redes de Colaboración")
@@ -29,7 +50,7 @@ if df_listo is None or not selected_cols:
     st.warning("Primero debes cargar y configurar los datos en la página de '🏠 Inicio'.")
     st.stop()
 
-df_redes_base = df_listo[selected_cols].copy()
+df_redes_base = proyectar_corpus(df_listo, selected_cols)
 COL_REVISTA, COL_COLABORADOR, COL_FECHA = 'Revista', 'Colaborador', 'Fecha Publicación'
 
 if not all(col in df_redes_base.columns for col in [COL_REVISTA, COL_COLABORADOR, COL_FECHA]):
@@ -56,15 +77,42 @@ if anos_disponibles:
 else:
     range_ano_seleccionado = None
 
+# Tipo de red
+tipos_red = {'Revistas–colaboradores (bimodal)': 'bimodal', 'Traductores → autores traducidos (dirigida)': 'traducciones'}
+tipo_red = tipos_red[st.sidebar.radio("Tipo de red:", list(tipos_red), help="La red de traducciones une cada traductor con los autores que tradujo, ponderada por número de textos.")]
+
 # Filtro de Revistas
 lista_revistas_red = sorted(df_redes_base[COL_REVISTA].dropna().unique())
 revistas_seleccionadas_red = st.sidebar.multiselect("Filtrar por revista(s):", lista_revistas_red, default=lista_revistas_red[:min(5, len(lista_revistas_red))])
 
+# Poda previa de la red bimodal
+with st.sidebar.expander("Poda de la red (antes de construirla)"):
+    poda_desactivada = tipo_red != 'bimodal'
+    min_contribuciones = st.number_input("Mín. contribuciones por colaborador:", min_value=1, value=1, step=1, disabled=poda_desactivada)
+    min_revistas_colab = st.number_input("Mín. revistas por colaborador:", min_value=1, value=1, step=1, disabled=poda_desactivada)
+    min_peso_arista = st.number_input("Mín. contribuciones por conexión:", min_value=1, value=1, step=1, disabled=poda_desactivada)
+    nucleo_k_poda = st.number_input("Núcleo k (0 = sin filtro):", min_value=0, value=0, step=1, disabled=poda_desactivada, help="Conserva solo los nodos con al menos k conexiones dentro de la red podada.")
+
 # Opciones de Rendimiento
 st.sidebar.markdown("---")
 st.sidebar.header("Opciones de rendimiento")
 calc_interm = st.sidebar.checkbox("Calcular intermediación (lento)", value=False, help="Activa el cálculo de la métrica 'Intermediación'.")
-use_physics = st.sidebar.checkbox("Habilitar simulación física", value=True, help="Activa la animación del grafo. Desactívalo si la red es muy grande.")
+opciones_metricas_extendidas = {'PageRank': 'PageRank', 'Centralidad de vector propio': 'Vector_Propio', 'Núcleo k (k-core)': 'Nucleo_K', 'Clustering local': 'Clustering', 'Componente conexa': 'Componente'}
+metricas_extendidas_sel = st.sidebar.multiselect(
+    "Métricas adicionales por nodo:", list(opciones_metricas_extendidas),
+    help="Se calculan en un solo lote sobre la matriz dispersa del grafo. PageRank y el vector propio cuentan los bucles (un nodo unido a sí mismo); el núcleo k y el clustering los ignoran."
+)
+# HITS solo tiene sentido en la red dirigida: en la bimodal, hubs y autoridades coincidirían
+calc_hits = tipo_red == 'traducciones' and st.sidebar.checkbox(
+    "Puntuaciones de hub y autoridad (HITS)", value=True, key="cb_hits",
+    help="Hubs: traductores que traducen a autores muy traducidos. Autoridades: autores traducidos por traductores muy activos."
+)
+metodos_disposicion = {'Dirigida por fuerzas': 'fuerzas', 'Espectral': 'espectral', 'Ninguna (solo física en el navegador)': None}
+metodo_disposicion = metodos_disposicion[st.sidebar.selectbox("Disposición precalculada en el servidor:", list(metodos_disposicion), help="Las coordenadas se calculan una vez por red y se reutilizan en cada visualización.")]
+use_physics = st.sidebar.checkbox("Habilitar simulación física", value=metodo_disposicion is None, help="Activa la animación del grafo en el navegador. Con una disposición precalculada no es necesaria.")
+max_nodos_visibles = st.sidebar.slider("Nodos visibles (nivel de detalle):", 50, 5000, 300, step=50, help="Se muestran las revistas y los nodos mejor clasificados; el resto se agrupa en nodos 'Otros'. Auméntalo para ver más detalle.")
+criterios_detalle = {'Centralidad de grado': 'Grado_Centralidad', 'Intermediación': 'Intermediacion', 'Núcleo k (k-core)': 'Nucleo_K'}
+criterio_detalle = criterios_detalle[st.sidebar.selectbox("Criterio para elegir los nodos visibles:", list(criterios_detalle))]
 
 # --- Lógica Principal con Botón ---
 st.header("1. Generar grafo principal")
@@ -80,55 +128,267 @@ else:
 
         if df_filtrado_red.empty:
             st.warning("No hay datos para el período y las revistas seleccionadas.")
+        elif tipo_red == 'traducciones' and 'Traductor' not in df_filtrado_red.columns:
+            st.warning("La red de traducciones necesita la columna 'Traductor' entre las columnas seleccionadas en '🏠 Inicio'.")
         else:
             with st.spinner("Construyendo red y calculando métricas..."):
-                G = crear_red_bimodal(df_filtrado_red, col_nodos_tipo1=COL_REVISTA, col_nodos_tipo2=COL_COLABORADOR)
-                metricas_globales, df_metricas_nodos = calcular_metricas_red(G, calcular_intermediacion=calc_interm)
+                if tipo_red == 'traducciones':
+                    G = crear_red_traducciones(df_filtrado_red, col_autor=COL_COLABORADOR)
+                else:
+                    G = crear_red_bimodal(
+                        df_filtrado_red[[COL_REVISTA, COL_COLABORADOR]], col_nodos_tipo1=COL_REVISTA, col_nodos_tipo2=COL_COLABORADOR,
+                        min_contribuciones=int(min_contribuciones), min_revistas=int(min_revistas_colab),
+                        min_peso_arista=int(min_peso_arista), nucleo_k=int(nucleo_k_poda)
+                    )
+                huella_G = calcular_huella_grafo(G)
+                metricas_globales, df_metricas_nodos = calcular_metricas_red(G, calcular_intermediacion=calc_interm, huella=huella_G)
+                if metricas_extendidas_sel:
+                    df_extendidas = calcular_metricas_extendidas(G, huella_G, metricas=tuple(opciones_metricas_extendidas[m] for m in metricas_extendidas_sel))
+                    df_metricas_nodos = df_metricas_nodos.merge(df_extendidas, on='Nodo', how='left')
+                if calc_hits and G.is_directed():
+                    df_metricas_nodos = df_metricas_nodos.merge(calcular_hits(G, huella_G), on='Nodo', how='left')
                 st.session_state.graph_G = G
                 st.session_state.df_metricas_nodos = df_metricas_nodos
+                st.session_state.tipo_red_generada = tipo_red
+                st.session_state.huella_G = huella_G
+                st.session_state.mapa_comunidades = None
 
             st.header(f"Resultados para el Período {range_ano_seleccionado[0]}-{range_ano_seleccionado[1]}" if range_ano_seleccionado else "Resultados de la Red")
             col1, col2, col3 = st.columns(3)
             col1.metric("Nodos Totales", f"{metricas_globales['Nodos']:,}")
             col2.metric("Conexiones Totales", f"{metricas_globales['Conexiones']:,}")
             col3.metric("Densidad de la Red", f"{metricas_globales['Densidad']:.4f}")
+            poda = G.graph.get('poda')
+            if poda and any(poda.values()):
+                st.caption(
+                    f"Poda aplicada: se descartaron {poda['Revistas']:,} revistas, {poda['Colaboradores']:,} colaboradores "
+                    f"y {poda['Conexiones']:,} conexiones antes de construir la red."
+                )
     
 # --- Mostrar Grafo y Métricas si han sido generados ---
 if st.session_state.get('graph_G'):
     st.subheader("Visualización del grafo interactivo")
     with st.spinner("Generando visualización..."):
-        html_source = visualizar_red_pyvis(st.session_state.graph_G, st.session_state.df_metricas_nodos, physics_enabled=use_physics)
-        if html_source: components.html(html_source, height=800)
+        df_posiciones = None
+        if metodo_disposicion:
+            df_posiciones = calcular_disposicion_red(st.session_state.graph_G, st.session_state.get('huella_G') or calcular_huella_grafo(st.session_state.graph_G), metodo=metodo_disposicion)
+        st.session_state.df_posiciones = df_posiciones
+        G_visible, df_nodos_visibles = reducir_red_nivel_detalle(st.session_state.graph_G, st.session_state.df_metricas_nodos, max_nodos_visibles, criterio=criterio_detalle, df_posiciones=df_posiciones)
+        if G_visible is not st.session_state.graph_G:
+            agrupacion = "por revista" if st.session_state.get('tipo_red_generada') != 'traducciones' else "por vecino mejor clasificado"
+            st.caption(f"Mostrando {G_visible.number_of_nodes():,} de {st.session_state.graph_G.number_of_nodes():,} nodos; el resto se agrupa en nodos 'Otros' {agrupacion}.")
+        visualizar_red(G_visible, df_nodos_visibles, physics_enabled=use_physics, key="red_principal")
     
     st.subheader("Métricas por nodo")
     st.dataframe(st.session_state.df_metricas_nodos)
 
+    # --- Consultas locales sobre la red ---
+    with st.expander("Consultar la red ego de un nodo o el camino mínimo entre dos nodos"):
+        G = st.session_state.graph_G
+        indice_consultas = construir_indice_consultas(G, st.session_state.get('huella_G') or calcular_huella_grafo(G))
+        nodos_consulta = st.session_state.df_metricas_nodos['Nodo'].tolist()
+        tab_ego, tab_camino = st.tabs(["Red ego", "Camino mínimo"])
+        with tab_ego:
+            col_nodo, col_radio = st.columns([3, 1])
+            nodo_ego = col_nodo.selectbox("Nodo central:", nodos_consulta, key="sel_nodo_ego")
+            radio_ego = col_radio.number_input("Saltos:", min_value=1, max_value=6, value=2, step=1, key="num_radio_ego")
+            if st.button("Mostrar red ego", key="btn_red_ego"):
+                G_ego, df_distancias = consultar_red_ego(indice_consultas, nodo_ego, int(radio_ego))
+                st.write(f"**{G_ego.number_of_nodes():,}** nodos y **{G_ego.number_of_edges():,}** conexiones a {int(radio_ego)} saltos o menos de **{nodo_ego}**.")
+                df_ego = df_distancias.merge(st.session_state.df_metricas_nodos, on='Nodo', how='left')
+                G_ego_visible, df_ego_visible = reducir_red_nivel_detalle(G_ego, df_ego, max_nodos_visibles, criterio='Grado_Centralidad')
+                visualizar_red(G_ego_visible, df_ego_visible, physics_enabled=True, altura=600, key="red_ego")
+                st.dataframe(df_ego)
+        with tab_camino:
+            col_origen, col_destino = st.columns(2)
+            nodo_origen = col_origen.selectbox("Origen:", nodos_consulta, key="sel_camino_origen")
+            nodo_destino = col_destino.selectbox("Destino:", nodos_consulta, index=min(1, len(nodos_consulta) - 1), key="sel_camino_destino")
+            if st.button("Buscar camino mínimo", key="btn_camino_minimo"):
+                camino = consultar_camino_minimo(indice_consultas, nodo_origen, nodo_destino)
+                if not camino:
+                    st.info("No existe ningún camino entre los dos nodos en la red generada.")
+                else:
+                    st.write(f"Camino de **{len(camino) - 1}** saltos: " + " → ".join(map(str, camino)))
+                    df_camino = pd.DataFrame({'Nodo': camino, 'Paso': range(len(camino))}).merge(st.session_state.df_metricas_nodos, on='Nodo', how='left')
+                    visualizar_red(G.subgraph(camino).copy(), df_camino, physics_enabled=True, altura=400, key="red_camino")
+
+    # --- Exportación ---
+    with st.expander("Exportar la red (Gephi, GraphML, CSV)"):
+        G = st.session_state.graph_G
+        opciones_exportacion = ["Red generada"] + (["Proyección ponderada de colaboradores"] if st.session_state.get('tipo_red_generada') != 'traducciones' else [])
+        col_red_exp, col_formato_exp = st.columns(2)
+        red_exportar = col_red_exp.selectbox("Red:", opciones_exportacion, key="sel_red_exportar")
+        formato_exportar = col_formato_exp.selectbox("Formato:", list(FORMATOS_EXPORTACION), key="sel_formato_exportar")
+        st.caption("Los nodos incluyen tipo, centralidades y, si se detectaron comunidades, 'ID_Comunidad'. En la proyección, el peso es el número de revistas compartidas.")
+        if st.button("Preparar archivo", key="btn_preparar_exportacion"):
+            with st.spinner("Escribiendo archivo..."):
+                if red_exportar == "Red generada":
+                    G_exportar = G
+                else:
+                    G_exportar = proyectar_red_ponderada(G, st.session_state.get('huella_G') or calcular_huella_grafo(G))
+                extension, tipo_mime = FORMATOS_EXPORTACION[formato_exportar]
+                # El archivo se escribe por bloques ya codificados, sin generar el documento como texto
+                archivo = io.BytesIO()
+                exportar_red(G_exportar, archivo, formato_exportar, st.session_state.df_metricas_nodos, st.session_state.get('mapa_comunidades'))
+                archivo.seek(0)
+            nombre = "red_colaboradores" if red_exportar != "Red generada" else ("red_traducciones" if st.session_state.get('tipo_red_generada') == 'traducciones' else "red_bimodal")
+            st.download_button(f"Descargar {nombre}.{extension}", data=archivo, file_name=f"{nombre}.{extension}", mime=tipo_mime, key="btn_descargar_exportacion")
+
     # --- Sección de Análisis de Modularidad ---
     st.markdown("---")
     st.header("2. Análisis de comunidades (Modularidad)")
     st.write("Este análisis se ejecutará sobre la red generada arriba.")
-    with st.expander("Ejecutar análisis de comunidades"):
-        if st.button("Detectar comunidades de colaboradores"):
-            with st.spinner("Proyectando red y detectando comunidades..."):
-                try:
-                    G = st.session_state.graph_G # Usar el grafo guardado
-                    df_metricas_nodos = st.session_state.df_metricas_nodos # Usar métricas guardadas
+    if st.session_state.get('tipo_red_generada') == 'traducciones':
+        st.info("El análisis de comunidades se basa en la proyección de la red bimodal de revistas y colaboradores. Genera esa red para usarlo.")
+    else:
+        with st.expander("Ejecutar análisis de comunidades"):
+            if st.button("Detectar comunidades de colaboradores"):
+                with st.spinner("Proyectando red y detectando comunidades..."):
+                    try:
+                        G = st.session_state.graph_G # Usar el grafo guardado
+                        df_metricas_nodos = st.session_state.df_metricas_nodos # Usar métricas guardadas
                     
-                    nodos_colaboradores = [n for n, d in G.nodes(data=True) if d['bipartite'] == 1]
-                    G_colaboradores = proyectar_red_unimodal(G, nodos_colaboradores)
-                    mapa_comunidades = detectar_comunidades_louvain(G_colaboradores)
+                        nodos_colaboradores = [n for n, d in G.nodes(data=True) if d['bipartite'] == 1]
+                        G_colaboradores = proyectar_red_unimodal(G, nodos_colaboradores)
+                        mapa_comunidades = detectar_comunidades_louvain(G_colaboradores, huella=calcular_huella_grafo(G_colaboradores))
                     
-                    st.success(f"¡Análisis completado! Se encontraron **{len(set(mapa_comunidades.values()))}** comunidades distintas.")
+                        st.session_state.mapa_comunidades = mapa_comunidades
+                        st.success(f"¡Análisis completado! Se encontraron **{len(set(mapa_comunidades.values()))}** comunidades distintas.")
                     
-                    st.subheader("Grafo bimodal coloreado por comunidad")
-                    html_source_comunidades = visualizar_red_pyvis(G, df_metricas_nodos, comunidades=mapa_comunidades)
-                    if html_source_comunidades:
-                        components.html(html_source_comunidades, height=800)
+                        st.subheader("Grafo bimodal coloreado por comunidad")
+                        G_visible, df_nodos_visibles = reducir_red_nivel_detalle(G, df_metricas_nodos, max_nodos_visibles, criterio=criterio_detalle, comunidades=mapa_comunidades, df_posiciones=st.session_state.get('df_posiciones'))
+                        visualizar_red(G_visible, df_nodos_visibles, comunidades=mapa_comunidades, physics_enabled=use_physics, key="red_comunidades")
                     
-                    df_comunidades = pd.DataFrame(mapa_comunidades.items(), columns=['Colaborador', 'ID_Comunidad'])
-                    st.subheader("Miembros de cada comunidad")
-                    st.dataframe(df_comunidades.sort_values(by='ID_Comunidad'))
-                except Exception as e:
-                    st.error(f"Ocurrió un error durante el análisis de comunidades: {e}")        
+                        df_comunidades = pd.DataFrame(mapa_comunidades.items(), columns=['Colaborador', 'ID_Comunidad'])
+                        st.subheader("Miembros de cada comunidad")
+                        st.dataframe(df_comunidades.sort_values(by='ID_Comunidad'))
+                    except Exception as e:
+                        st.error(f"Ocurrió un error durante el análisis de comunidades: {e}")        
+
+        with st.expander("Evaluar la estabilidad de las comunidades (varias semillas y resoluciones)"):
+            st.write("Ejecuta Louvain para una rejilla de semillas y resoluciones en procesos paralelos y construye una partición de consenso.")
+            col_sem, col_res = st.columns(2)
+            num_semillas = col_sem.number_input("Número de semillas:", min_value=1, max_value=50, value=5, step=1, key="num_semillas_estabilidad")
+            rango_resolucion = col_res.slider("Rango de resolución:", 0.1, 3.0, (0.5, 1.5), step=0.1, key="slider_resolucion_estabilidad")
+            col_pasos, col_lpa, col_trab = st.columns(3)
+            num_resoluciones = col_pasos.number_input("Valores de resolución:", min_value=1, max_value=20, value=5, step=1, key="num_resoluciones_estabilidad")
+            incluir_lpa = col_lpa.checkbox("Incluir propagación de etiquetas", value=False, key="cb_lpa_estabilidad")
+            num_trabajadores = col_trab.number_input("Procesos en paralelo:", min_value=1, max_value=32, value=4, step=1, key="num_trabajadores_estabilidad")
+
+            if st.button("Analizar estabilidad", key="btn_estabilidad_comunidades"):
+                with st.spinner("Ejecutando las particiones en paralelo..."):
+                    try:
+                        G = st.session_state.graph_G
+                        nodos_colaboradores = [n for n, d in G.nodes(data=True) if d['bipartite'] == 1]
+                        G_colaboradores = proyectar_red_unimodal(G, nodos_colaboradores)
+                        semillas = tuple(range(1, int(num_semillas) + 1))
+                        resoluciones = tuple(round(r, 3) for r in np.linspace(rango_resolucion[0], rango_resolucion[1], int(num_resoluciones)))
+                        df_curva, mapa_consenso, df_estabilidad = analizar_estabilidad_comunidades(
+                            G_colaboradores, calcular_huella_grafo(G_colaboradores), semillas=semillas, resoluciones=resoluciones,
+                            incluir_propagacion=incluir_lpa, max_trabajadores=int(num_trabajadores)
+                        )
+                        if df_curva.empty:
+                            st.info("La red proyectada no tiene nodos para analizar.")
+                        else:
+                            st.success(f"Partición de consenso con **{len(set(mapa_consenso.values()))}** comunidades a partir de **{len(df_curva)}** ejecuciones.")
+                            df_curva_louvain = df_curva[df_curva['Metodo'] == 'Louvain']
+                            fig_curva = px.scatter(df_curva_louvain, x='Resolucion', y='Modularidad', color='Num_Comunidades', hover_data=['Semilla'], title="Curva de modularidad por resolución")
+                            fig_curva.add_scatter(x=df_curva_louvain.groupby('Resolucion')['Modularidad'].mean().index, y=df_curva_louvain.groupby('Resolucion')['Modularidad'].mean().values, mode='lines', name='Media', showlegend=False)
+                            st.plotly_chart(fig_curva, use_container_width=True)
+                            st.dataframe(df_curva)
+                            col_m1, col_m2 = st.columns(2)
+                            col_m1.metric("Estabilidad media", f"{df_estabilidad['Estabilidad'].mean():.3f}")
+                            col_m2.metric("Nodos con estabilidad < 0.5", f"{(df_estabilidad['Estabilidad'] < 0.5).sum():,}")
+                            st.subheader("Asignación de consenso y estabilidad por nodo")
+                            st.dataframe(df_estabilidad.rename(columns={'Nodo': COL_COLABORADOR}))
+                    except Exception as e:
+                        st.error(f"Ocurrió un error durante el análisis de estabilidad: {e}")
 else:
-    st.info("Haz clic en 'Generar red y calcular métricas' para empezar.")
\ No newline at end of file
+    st.info("Haz clic en 'Generar red y calcular métricas' para empezar.")
+
+# --- Sección de Evolución Temporal ---
+st.markdown("---")
+st.header("3. Evolución temporal de la red")
+st.write("Recorre el rango de años seleccionado año a año o con una ventana móvil y calcula las métricas en una sola ejecución.")
+with st.expander("Línea de tiempo anual"):
+    st.write("Calcula para cada año las revistas y colaboradores activos, las conexiones, la densidad, el grado medio y la proporción de colaboradores en varias revistas.")
+    if st.button("Calcular línea de tiempo", key="btn_linea_tiempo"):
+        if not revistas_seleccionadas_red:
+            st.warning("Por favor, selecciona al menos una revista en la barra lateral.")
+        else:
+            df_anual = df_redes_base[df_redes_base[COL_REVISTA].isin(revistas_seleccionadas_red)]
+            if range_ano_seleccionado:
+                df_anual = df_anual[(df_anual['Año'] >= range_ano_seleccionado[0]) & (df_anual['Año'] <= range_ano_seleccionado[1])]
+            df_linea = calcular_linea_tiempo_anual(df_anual[['Año', COL_REVISTA, COL_COLABORADOR]], col_nodos_tipo1=COL_REVISTA, col_nodos_tipo2=COL_COLABORADOR)
+            if df_linea.empty:
+                st.info("No hay datos para los filtros actuales.")
+            else:
+                st.dataframe(df_linea)
+                metricas_linea = ['Revistas', 'Colaboradores', 'Conexiones', 'Densidad', 'Grado_Medio', 'Prop_Multirrevista']
+                fig_linea = px.line(df_linea, x='Año', y=metricas_linea, facet_row='variable', markers=True, title="Estadísticas de la red por año", height=200 * len(metricas_linea))
+                fig_linea.update_yaxes(matches=None, title=None)
+                fig_linea.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+                st.plotly_chart(fig_linea, use_container_width=True)
+
+with st.expander("Ejecutar análisis temporal"):
+    col_ventana, col_paso, col_mod = st.columns(3)
+    tamano_ventana = col_ventana.number_input("Tamaño de la ventana (años):", min_value=1, value=5, step=1, key="num_ventana_temporal")
+    paso_ventana = col_paso.number_input("Paso entre ventanas (años):", min_value=1, value=1, step=1, key="num_paso_temporal")
+    calc_modularidad_temporal = col_mod.checkbox("Calcular modularidad", value=True, help="Ejecuta Louvain en cada ventana.", key="cb_modularidad_temporal")
+
+    if st.button("Calcular métricas por ventana", key="btn_ventanas_temporales"):
+        if not revistas_seleccionadas_red:
+            st.warning("Por favor, selecciona al menos una revista en la barra lateral.")
+        else:
+            df_temporal = df_redes_base[df_redes_base[COL_REVISTA].isin(revistas_seleccionadas_red)]
+            if range_ano_seleccionado:
+                df_temporal = df_temporal[(df_temporal['Año'] >= range_ano_seleccionado[0]) & (df_temporal['Año'] <= range_ano_seleccionado[1])]
+            with st.spinner("Recorriendo ventanas temporales..."):
+                df_ventanas = calcular_metricas_ventanas_temporales(
+                    df_temporal[['Año', COL_REVISTA, COL_COLABORADOR]], int(tamano_ventana), int(paso_ventana),
+                    col_nodos_tipo1=COL_REVISTA, col_nodos_tipo2=COL_COLABORADOR, calcular_modularidad=calc_modularidad_temporal
+                )
+            if df_ventanas.empty:
+                st.info("No hay datos para construir ventanas con los filtros actuales.")
+            else:
+                st.dataframe(df_ventanas)
+                metricas_grafico = ['Nodos', 'Conexiones', 'Componente_Mayor'] + (['Modularidad'] if calc_modularidad_temporal else [])
+                fig_ventanas = px.line(df_ventanas, x='Año_Inicio', y=metricas_grafico, facet_row='variable', markers=True, hover_name='Ventana', title="Métricas por ventana temporal")
+                fig_ventanas.update_yaxes(matches=None, title=None)
+                fig_ventanas.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+                st.plotly_chart(fig_ventanas, use_container_width=True)
+
+# --- Sección de Similitud entre Revistas ---
+st.markdown("---")
+st.header("4. Similitud entre revistas por colaboradores compartidos")
+st.write("Compara cada par de revistas según los colaboradores que comparten, con un único producto de la matriz de incidencia revista–colaborador.")
+with st.expander("Calcular similitud entre revistas"):
+    col_medida, col_k, col_sel = st.columns(3)
+    medida_similitud = col_medida.selectbox("Medida:", list(MEDIDAS_SIMILITUD), format_func=MEDIDAS_SIMILITUD.get, index=1, key="sel_medida_similitud")
+    k_similares = col_k.number_input("Revistas similares por revista:", min_value=1, max_value=20, value=5, step=1, key="num_k_similares")
+    solo_seleccionadas = col_sel.checkbox("Solo las revistas seleccionadas", value=False, key="cb_similitud_seleccionadas")
+    rango_similitud = None
+    if anos_disponibles:
+        rango_similitud = st.slider("Ventana de años:", min_ano, max_ano, range_ano_seleccionado, key="slider_anos_similitud")
+
+    if st.button("Calcular similitud", key="btn_similitud_revistas"):
+        df_similitud = df_redes_base[df_redes_base[COL_REVISTA].isin(revistas_seleccionadas_red)] if solo_seleccionadas else df_redes_base
+        matrices = calcular_similitud_revistas(
+            df_similitud[['Año', COL_REVISTA, COL_COLABORADOR]], col_revista=COL_REVISTA, col_colaborador=COL_COLABORADOR,
+            rango_anos=tuple(rango_similitud) if rango_similitud else None
+        )
+        df_matriz = matrices[medida_similitud]
+        if len(df_matriz) < 2:
+            st.info("Se necesitan al menos dos revistas con colaboradores en la ventana seleccionada.")
+        else:
+            df_ordenada = ordenar_matriz_por_agrupamiento(df_matriz)
+            fig_similitud = px.imshow(
+                df_ordenada, color_continuous_scale='Blues', aspect='auto',
+                labels={'color': MEDIDAS_SIMILITUD[medida_similitud]}, title=f"{MEDIDAS_SIMILITUD[medida_similitud]} entre revistas (ordenadas por agrupamiento)",
+                height=max(500, 18 * len(df_ordenada))
+            )
+            fig_similitud.update_xaxes(showticklabels=len(df_ordenada) <= 80, title=None)
+            fig_similitud.update_yaxes(showticklabels=len(df_ordenada) <= 80, title=None)
+            st.plotly_chart(fig_similitud, use_container_width=True)
+            st.subheader(f"Las {int(k_similares)} revistas más similares a cada revista")
+            st.dataframe(obtener_revistas_similares(df_matriz, int(k_similares)), hide_index=True)